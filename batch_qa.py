@@ -0,0 +1,187 @@
+# batch_qa.py
+"""
+Answers a file of questions against the report without the Streamlit UI.
+
+Each question goes through the same path as a chat turn with no history:
+the local structured-query answers first (unless --model-only), then
+request_gemini_answer() with the dashboard's system prompt, context cache,
+retries, circuit breaker and rate limiter. Questions run concurrently on
+--concurrency workers; --rpm caps HTTP attempts per minute.
+
+  python batch_qa.py questions.txt --output answers.jsonl
+  python batch_qa.py questions.jsonl --output answers.jsonl --concurrency 8 --rpm 120 --search
+  python batch_qa.py questions.txt --output answers.jsonl --api-base http://127.0.0.1:8765/v1beta
+
+Questions are read from a text file (one per line; blank lines and lines
+starting with # are skipped) or a JSONL file of {"question": ..., "id": ...,
+"enable_search": ...} objects, where id and enable_search are optional. A
+question's id defaults to a hash of its text and search flag.
+
+Every result is appended to --output as one JSON line as soon as it is
+ready, with id, question, answer, ok, answered_by (report or model),
+latency_ms, tokens (the API's usage counts), sources (search grounding)
+and answered_at. Rerunning with the same --output skips questions already
+answered successfully, so an interrupted run resumes where it stopped;
+failed questions are retried unless --skip-failed is given, so the
+latest line for an id is its current result.
+
+Set GEMINI_API_KEY (GEMINI_API_KEY=mock for mock_gemini_server.py).
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import hospitality_dashboard as hd
+
+TOKEN_FIELDS = {"promptTokenCount": "prompt", "candidatesTokenCount": "candidates",
+                "cachedContentTokenCount": "cached", "totalTokenCount": "total"}
+
+
+def question_id(question, enable_search):
+    return hashlib.sha256(f"{enable_search}:{question}".encode("utf-8")).hexdigest()[:16]
+
+
+def read_questions(path, enable_search):
+    """Returns [{"id", "question", "enable_search"}] from a .txt or .jsonl file, without duplicate ids."""
+    questions = {}
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or (line.startswith("#") and not path.endswith(".jsonl")):
+                continue
+            if path.endswith(".jsonl"):
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{line_number}: {e}") from None
+                if not isinstance(item, dict) or not str(item.get("question", "")).strip():
+                    raise ValueError(f"{path}:{line_number}: expected an object with a \"question\"")
+                question = str(item["question"]).strip()
+                search = bool(item.get("enable_search", enable_search))
+                qid = str(item.get("id") or question_id(question, search))
+            else:
+                question, search = line, enable_search
+                qid = question_id(question, search)
+            questions.setdefault(qid, {"id": qid, "question": question, "enable_search": search})
+    return list(questions.values())
+
+
+def read_done(path, skip_failed):
+    """Ids already in the output file: answered ones, plus failed ones with skip_failed."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interruption; the question is asked again
+                continue
+            if not isinstance(record, dict) or "id" not in record:
+                # Not a result line (e.g. edited by hand); skipped the same way
+                continue
+            if record.get("ok") or skip_failed:
+                done.add(record["id"])
+    return done
+
+
+def answer(item, model_only):
+    """Answers one question. Returns its output record."""
+    start = time.perf_counter()
+    local_answer = None if model_only else hd.answer_structured_query(item["question"])
+    if local_answer is not None:
+        result = {"text": local_answer, "ok": True, "usage": None, "sources": []}
+        answered_by = "report"
+    else:
+        result = hd.request_gemini_answer(item["question"], [], item["enable_search"])
+        answered_by = "model"
+    usage = result["usage"] or {}
+    return {
+        "id": item["id"],
+        "question": item["question"],
+        "enable_search": item["enable_search"],
+        "answer": result["text"],
+        "ok": result["ok"],
+        "answered_by": answered_by,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        "tokens": {name: usage[field] for field, name in TOKEN_FIELDS.items() if field in usage},
+        "sources": result["sources"],
+        "answered_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def run(items, output_path, concurrency, model_only):
+    """Answers `items` on a thread pool, appending each record to output_path as it completes."""
+    latencies, failed, tokens = [], 0, 0
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-qa")
+    try:
+        with open(output_path, "a", encoding="utf-8") as out:
+            futures = [executor.submit(answer, item, model_only) for item in items]
+            for done, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                latencies.append(record["latency_ms"])
+                failed += not record["ok"]
+                tokens += record["tokens"].get("total", 0)
+                status = "ok" if record["ok"] else "FAILED"
+                print(f"[{done}/{len(items)}] {status} {record['latency_ms']:.0f} ms  {record['question'][:70]}",
+                      file=sys.stderr)
+    finally:
+        # On Ctrl-C, drop the questions that have not started; the next run resumes them
+        executor.shutdown(wait=True, cancel_futures=True)
+    return latencies, failed, tokens
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("questions", help="Questions file (.txt, one per line, or .jsonl).")
+    parser.add_argument("--output", required=True, help="JSONL results file; appended to and used to resume.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Questions answered at once (default: 4).")
+    parser.add_argument("--rpm", type=float, default=hd.CHAT_RATE_LIMIT_RPM,
+                        help=f"Max API attempts per minute, retries included; 0 = unlimited (default: {hd.CHAT_RATE_LIMIT_RPM:g}).")
+    parser.add_argument("--search", action="store_true", help="Enable live search for questions that do not set it.")
+    parser.add_argument("--model-only", action="store_true", help="Send every question to the model, skipping local answers.")
+    parser.add_argument("--skip-failed", action="store_true", help="Do not retry questions that failed in an earlier run.")
+    parser.add_argument("--api-base", help="Gemini API base URL, e.g. a local mock_gemini_server (default: GEMINI_API_BASE).")
+    args = parser.parse_args(argv)
+
+    if args.api_base:
+        hd.GEMINI_API_BASE = args.api_base.rstrip("/")
+    # Read by get_rate_limiter() on first use
+    hd.CHAT_RATE_LIMIT_RPM = args.rpm
+    if not hd.get_setting("GEMINI_API_KEY") and not args.model_only:
+        print("warning: GEMINI_API_KEY is not set; only questions with local answers will succeed", file=sys.stderr)
+
+    try:
+        questions = read_questions(args.questions, args.search)
+        done = read_done(args.output, args.skip_failed)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    pending = [item for item in questions if item["id"] not in done]
+    print(f"{len(questions)} questions, {len(questions) - len(pending)} already answered, {len(pending)} to go",
+          file=sys.stderr)
+
+    start = time.perf_counter()
+    try:
+        latencies, failed, tokens = run(pending, args.output, max(args.concurrency, 1), args.model_only)
+    except KeyboardInterrupt:
+        print(f"Interrupted; rerun with --output {args.output} to resume.", file=sys.stderr)
+        return 130
+    if latencies:
+        ordered = sorted(latencies)
+        print(f"Answered {len(latencies) - failed}/{len(latencies)} in {time.perf_counter() - start:.1f}s "
+              f"(p50 {ordered[len(ordered) // 2]:.0f} ms, p95 {ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]:.0f} ms, "
+              f"{tokens:,} tokens)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,505 @@
+# benchmark.py
+"""
+Reproducible performance benchmarks for the dashboard.
+
+Measures:
+  rerun    script run time of each view through streamlit.testing's AppTest
+           (first run with cold caches, then warm reruns), and the delta
+           messages and bytes a rerun sends with RENDER_MODE elements vs batched
+  figures  build and to_json time and payload bytes of the report figures, plus the cached get_figure() path and the payload budget
+           applied to a synthetic large line chart
+  prompt   size and build time of get_system_prompt(), full and retrieval
+  chat     end-to-end call_gemini_chatbot() / stream_gemini_chatbot() latency
+           against mock_gemini_server with configurable delay and faults
+  chat_rerun  script time of a chat turn with every view in st.tabs, as a
+           full rerun vs a rerun of the chat fragment alone, and the views
+           each one renders (fails if the fragment rerun renders any)
+  tracing  per-call cost of span() and @traced with tracing off and on
+  timeseries  build time of a synthetic time-series store and query time of
+           the chart rollups as the raw history grows
+
+Results are written as JSON; pass a previous run with --compare to print the
+change of every timing and size between two commits.
+
+  python benchmark.py --output bench.json
+  python benchmark.py --only chat --mock-delay 0.2 --mock-error-rate 0.1
+  python benchmark.py --output new.json --compare bench.json
+"""
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmark the dashboard's own overhead, not the API quota guard
+os.environ.setdefault("CHAT_RATE_LIMIT_RPM", "0")
+
+import plotly.io as pio
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+from streamlit.testing.v1 import AppTest, local_script_runner
+
+import hospitality_dashboard as hd
+import mock_gemini_server
+
+SECTIONS = ("rerun", "figures", "prompt", "chat", "chat_rerun", "tracing", "timeseries")
+
+PROMPT_QUERIES = [
+    "What are the main traveller motivations in Kerala?",
+    "How does airport connectivity in Karnataka compare with Telangana?",
+]
+
+
+def timed(fn, *args, **kwargs):
+    """Returns (result, elapsed milliseconds) of fn(*args, **kwargs)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def summarize(samples_ms):
+    """Summary statistics (milliseconds) of a list of timings."""
+    if not samples_ms:
+        return {"n": 0}
+    return {
+        "n": len(samples_ms),
+        "min_ms": round(min(samples_ms), 3),
+        "median_ms": round(statistics.median(samples_ms), 3),
+        "mean_ms": round(statistics.fmean(samples_ms), 3),
+        "p95_ms": round(percentile(samples_ms, 0.95), 3),
+        "max_ms": round(max(samples_ms), 3),
+    }
+
+
+def _render_view(view_index):
+    # Runs as an AppTest script: renders a single dashboard view
+    import streamlit as st
+
+    import hospitality_dashboard as hd
+
+    st.set_page_config(layout="wide")
+    hd.get_views()[view_index][2]()
+
+
+def count_deltas(at):
+    """Delta messages (elements and blocks) and their serialized bytes in an AppTest's rendered tree."""
+    messages = size = 0
+    stack = [at._tree]
+    while stack:
+        node = stack.pop()
+        stack.extend(getattr(node, "children", {}).values())
+        proto = getattr(node, "proto", None)
+        if proto is not None:
+            messages += 1
+            size += proto.ByteSize()
+    return {"messages": messages, "bytes": size}
+
+
+def bench_rerun(repeat):
+    """
+    First-run and warm rerun time of each view, executed in isolation, and
+    the delta messages one rerun sends in each RENDER_MODE.
+    """
+    results = {}
+    saved_mode = hd.RENDER_MODE
+    try:
+        for index, (title, url_path, _) in enumerate(hd.get_views()):
+            deltas = {}
+            for mode in ("elements", "batched"):
+                hd.RENDER_MODE = mode
+                at = AppTest.from_function(_render_view, args=(index,), default_timeout=120)
+                at.run()
+                if at.exception:
+                    raise RuntimeError(f"View {title!r} raised: {at.exception[0].value}")
+                deltas[mode] = count_deltas(at)
+            hd.RENDER_MODE = saved_mode
+            at = AppTest.from_function(_render_view, args=(index,), default_timeout=120)
+            _, first_ms = timed(at.run)
+            reruns = [timed(at.run)[1] for _ in range(repeat)]
+            results[url_path] = {"title": title, "first_run_ms": round(first_ms, 3), "rerun": summarize(reruns),
+                                 "deltas": deltas}
+    finally:
+        hd.RENDER_MODE = saved_mode
+    return results
+
+
+def trace_points(trace):
+    """Number of data points in a cartesian or polar trace."""
+    values = trace.to_plotly_json()
+    for key in ("x", "r"):
+        if values.get(key) is not None:
+            return len(values[key])
+    return 0
+
+
+def bench_figures(repeat):
+    """Build and serialization cost of every figure, and the cached get_figure() path."""
+    overview = hd.DATA["Overview"]
+    inputs = {"comparative_arrivals": overview["Comparative_Arrivals"], "sentiment_radar": overview["Sentiment_Radar"]}
+    results = {}
+    # arrivals_trend plots the time-series store; see the timeseries section
+    for name, data in inputs.items():
+        builder = hd.FIGURE_BUILDERS[name]
+        builds, serializes, loads = [], [], []
+        for _ in range(repeat):
+            fig, build_ms = timed(builder, data)
+            fig_json, serialize_ms = timed(fig.to_json)
+            _, load_ms = timed(pio.from_json, fig_json, skip_invalid=True)
+            builds.append(build_ms)
+            serializes.append(serialize_ms)
+            loads.append(load_ms)
+        hd.get_figure(name, data)
+        cached = [timed(hd.get_figure, name, data)[1] for _ in range(repeat)]
+        budgeted = hd.apply_payload_budget(fig)
+        results[name] = {
+            "build": summarize(builds),
+            "serialize": summarize(serializes),
+            "deserialize": summarize(loads),
+            "cached_get_figure": summarize(cached),
+            "payload_bytes": len(budgeted.to_json().encode("utf-8")),
+            "unbudgeted_payload_bytes": len(fig_json.encode("utf-8")),
+            "traces": len(fig.data),
+            "points": sum(trace_points(trace) for trace in fig.data),
+        }
+    results["large_series"] = bench_payload_budget(repeat)
+    return results
+
+
+def bench_payload_budget(repeat, traces=6, points=50_000):
+    """Payload budget on a synthetic line chart much larger than FIGURE_POINT_BUDGET."""
+    import math
+
+    import plotly.graph_objects as go
+
+    x = list(range(points))
+    fig = go.Figure([go.Scatter(x=x, y=[math.sin(i / (500 + 50 * t)) * 100 + t for i in x], mode="lines", name=f"series {t}")
+                     for t in range(traces)])
+    results = {"points": traces * points, "unbudgeted_payload_bytes": len(fig.to_json().encode("utf-8"))}
+    saved = hd.FIGURE_DOWNSAMPLING
+    try:
+        for method in ("lttb", "minmax"):
+            hd.FIGURE_DOWNSAMPLING = method
+            samples = []
+            for _ in range(repeat):
+                budgeted, budget_ms = timed(hd.apply_payload_budget, fig)
+                samples.append(budget_ms)
+            results[method] = {
+                "apply_budget": summarize(samples),
+                "payload_bytes": len(budgeted.to_json().encode("utf-8")),
+                "points": sum(trace_points(trace) for trace in budgeted.data),
+                "trace_types": sorted({trace.type for trace in budgeted.data}),
+            }
+    finally:
+        hd.FIGURE_DOWNSAMPLING = saved
+    return results
+
+
+def bench_prompt(repeat):
+    """Size and build time of the system prompt, full report and retrieval excerpts."""
+    results = {}
+    for enable_search in (False, True):
+        mode = "agent" if enable_search else "rag"
+        colds = []
+        for _ in range(repeat):
+            hd._build_system_prompts.clear()
+            prompt, cold_ms = timed(hd.get_system_prompt, enable_search)
+            colds.append(cold_ms)
+        warm = [timed(hd.get_system_prompt, enable_search)[1] for _ in range(repeat)]
+        results[f"{mode}_full"] = {
+            "chars": len(prompt),
+            "estimated_tokens": hd.estimate_tokens(prompt),
+            "cold_build": summarize(colds),
+            "cached": summarize(warm),
+        }
+        if hd.REPORT_CONTEXT == "retrieval":
+            sizes, builds = [], []
+            for query in PROMPT_QUERIES:
+                for _ in range(repeat):
+                    prompt, build_ms = timed(hd.get_system_prompt, enable_search, query)
+                    builds.append(build_ms)
+                sizes.append(len(prompt))
+            results[f"{mode}_retrieval"] = {
+                "chars_mean": round(statistics.fmean(sizes), 1),
+                "estimated_tokens_mean": round(statistics.fmean(hd.estimate_tokens("x" * size) for size in sizes), 1),
+                "build": summarize(builds),
+            }
+    return results
+
+
+def bench_chat(requests_per_mode, delay, chunk_delay, error_rate, fail_first, error_status):
+    """End-to-end chatbot latency against a local mock Gemini server."""
+    server, api_base = mock_gemini_server.start_in_background(
+        delay=delay, chunk_delay=chunk_delay, error_rate=error_rate, fail_first=fail_first, error_status=error_status)
+    saved = hd.GEMINI_API_BASE, os.environ.get("GEMINI_API_KEY")
+    hd.GEMINI_API_BASE = api_base
+    os.environ["GEMINI_API_KEY"] = "mock"
+    run_id = time.time_ns()
+    try:
+        results = {}
+        for mode in ("blocking", "streaming"):
+            latencies, first_chunk, failures = [], [], 0
+            for i in range(requests_per_mode):
+                # Unique open-ended questions bypass the local fast path and the answer cache
+                prompt = f"Why does benchmark question {run_id}-{mode}-{i} matter for Kerala tourism?"
+                start = time.perf_counter()
+                if mode == "blocking":
+                    answer = hd.call_gemini_chatbot(prompt, [], False)
+                else:
+                    answer = ""
+                    for chunk in hd.stream_gemini_chatbot(prompt, [], False):
+                        if not answer:
+                            first_chunk.append((time.perf_counter() - start) * 1000)
+                        answer += chunk
+                latencies.append((time.perf_counter() - start) * 1000)
+                if not answer.startswith("Mock analyst answer"):
+                    failures += 1
+            results[mode] = {"latency": summarize(latencies), "failures": failures}
+            if first_chunk:
+                results[mode]["time_to_first_chunk"] = summarize(first_chunk)
+        with server.RequestHandlerClass.lock:
+            results["mock_server"] = dict(server.RequestHandlerClass.stats)
+        results["mock_config"] = {"delay": delay, "chunk_delay": chunk_delay, "error_rate": error_rate,
+                                  "fail_first": fail_first, "error_status": error_status}
+        return results
+    finally:
+        hd.GEMINI_API_BASE = saved[0]
+        if saved[1] is None:
+            os.environ.pop("GEMINI_API_KEY", None)
+        else:
+            os.environ["GEMINI_API_KEY"] = saved[1]
+        server.shutdown()
+
+
+def _render_tabs():
+    # Runs as an AppTest script: every view in the legacy st.tabs layout
+    import streamlit as st
+
+    import hospitality_dashboard as hd
+
+    st.set_page_config(layout="wide")
+    hd.render_tabs(hd.get_views())
+
+
+@contextlib.contextmanager
+def fragment_scoped(at):
+    """
+    Makes AppTest reruns inside the block fragment-scoped, as the browser
+    sends them for a widget inside an st.fragment. AppTest itself always
+    reruns the whole script.
+    """
+    fragment_ids = list(at._fragment_storage._fragments)
+    saved = local_script_runner.RerunData
+    local_script_runner.RerunData = functools.partial(
+        RerunData, fragment_id_queue=fragment_ids, is_fragment_scoped_rerun=True)
+    try:
+        yield
+    finally:
+        local_script_runner.RerunData = saved
+
+
+def bench_chat_rerun(repeat):
+    """
+    Script time of a chat turn in the tabs layout as a full rerun and as a
+    rerun of the chat fragment alone, and how many views each one renders.
+    The fragment rerun must not render the overview or any state view.
+    """
+    server, api_base = mock_gemini_server.start_in_background()
+    saved = hd.GEMINI_API_BASE, os.environ.get("GEMINI_API_KEY"), hd.create_overview_tab, hd.create_state_tab
+    hd.GEMINI_API_BASE = api_base
+    os.environ["GEMINI_API_KEY"] = "mock"
+    rendered = []
+    hd.create_overview_tab = lambda *args: rendered.append("overview") or saved[2](*args)
+    hd.create_state_tab = lambda *args: rendered.append("state") or saved[3](*args)
+    run_id = time.time_ns()
+    try:
+        at = AppTest.from_function(_render_tabs, default_timeout=120)
+        at.run()
+        results = {}
+        for mode in ("full", "fragment"):
+            turns, views = [], []
+            with fragment_scoped(at) if mode == "fragment" else contextlib.nullcontext():
+                for i in range(repeat):
+                    del rendered[:]
+                    prompt = f"Why does benchmark question {run_id}-{mode}-{i} matter for Kerala tourism?"
+                    turns.append(timed(at.chat_input[0].set_value(prompt).run)[1])
+                    if at.exception:
+                        raise RuntimeError(f"Chat turn raised: {at.exception[0].value}")
+                    views.append(len(rendered))
+            results[mode] = {"turn": summarize(turns), "views_rendered": max(views)}
+        if results["fragment"]["views_rendered"]:
+            raise RuntimeError("A chat fragment rerun rendered the overview or a state view")
+        return results
+    finally:
+        hd.GEMINI_API_BASE, key, hd.create_overview_tab, hd.create_state_tab = saved
+        if key is None:
+            os.environ.pop("GEMINI_API_KEY", None)
+        else:
+            os.environ["GEMINI_API_KEY"] = key
+        server.shutdown()
+
+
+def bench_tracing(calls=100_000):
+    """Per-call overhead (nanoseconds) of span() and @traced, with tracing off and on."""
+    def noop():
+        pass
+
+    def per_call_ns(fn):
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            fn()
+        return round((time.perf_counter_ns() - start) / calls, 1)
+
+    def with_span():
+        with hd.span("benchmark"):
+            pass
+
+    saved = hd.TRACING
+    try:
+        results = {"baseline_call_ns": per_call_ns(noop)}
+        for enabled in (False, True):
+            hd.TRACING = enabled
+            mode = "enabled" if enabled else "disabled"
+            traced_noop = hd.traced("benchmark")(noop)
+            results[mode] = {
+                "span_ns": per_call_ns(with_span),
+                "traced_call_ns": per_call_ns(traced_noop),
+                "traced_is_undecorated": traced_noop is noop,
+            }
+        return results
+    finally:
+        hd.TRACING = saved
+
+
+def bench_timeseries(repeat, districts_per_state, years):
+    """Store build time and rollup query time over synthetic monthly district history."""
+    import pyarrow.compute as pc
+
+    import build_timeseries
+
+    with tempfile.TemporaryDirectory() as store_path:
+        rows, generate_ms = timed(build_timeseries.synthetic_rows, districts_per_state, years[0], years[1])
+        manifest, build_ms = timed(build_timeseries.ingest, store_path, rows)
+        # Re-ingesting one month only recomputes that year's rollups
+        month = rows.filter(pc.and_(pc.equal(rows["year"], years[1]), pc.equal(rows["month"], 12)))
+        _, incremental_ms = timed(build_timeseries.ingest, store_path, month)
+        store, load_ms = timed(hd.TimeSeriesStore, store_path)
+        queries = {
+            "comparative_arrivals_all_years": (store.comparative_arrivals, years),
+            "comparative_arrivals_one_year": (store.comparative_arrivals, (years[1], years[1])),
+            "trend_state_year": (store.trend, ("state_year", "arrivals", *years)),
+            "trend_state_month": (store.trend, ("state_month", "arrivals", *years)),
+            "trend_region_year": (store.trend, ("region_year", "occupancy_pct", *years)),
+        }
+        return {
+            "raw_rows": manifest["rows"],
+            "rollup_rows": {name: len(table) for name, table in store.rollups.items()},
+            "generate_ms": round(generate_ms, 3),
+            "build_ms": round(build_ms, 3),
+            "incremental_ingest_ms": round(incremental_ms, 3),
+            "load_ms": round(load_ms, 3),
+            "queries": {name: summarize([timed(fn, *args)[1] for _ in range(repeat)]) for name, (fn, args) in queries.items()},
+        }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=""):
+    """Yields (dotted.path, value) for every numeric timing or size leaf."""
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, path + ".")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and (
+                key.endswith("_ms") or key.endswith("bytes") or key.startswith("chars") or key.startswith("estimated_tokens")):
+            yield path, value
+
+
+def compare(baseline, current):
+    """Prints the relative change of every metric present in both runs."""
+    before = dict(flatten(baseline["results"]))
+    print(f"Compared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for path, value in flatten(current["results"]):
+        if path in before and before[path]:
+            change = (value - before[path]) / before[path]
+            print(f"  {path:<60} {before[path]:>12.3f} -> {value:>12.3f}  {change:+.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", help=f"Comma-separated sections to run (default: all of {','.join(SECTIONS)}).")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per timing (default: 5).")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout.")
+    parser.add_argument("--compare", help="Previous JSON results to compare against.")
+    parser.add_argument("--chat-requests", type=int, default=10, help="Chat requests per mode (default: 10).")
+    parser.add_argument("--mock-delay", type=float, default=0.0, help="Mock server response delay in seconds.")
+    parser.add_argument("--mock-chunk-delay", type=float, default=0.0, help="Mock server delay between streamed chunks.")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0, help="Probability of an injected mock failure.")
+    parser.add_argument("--mock-fail-first", type=int, default=0, help="Fail the first N mock requests.")
+    parser.add_argument("--mock-error-status", type=int, default=503, help="HTTP status of injected failures.")
+    parser.add_argument("--timeseries-districts", type=int, default=700,
+                        help="Synthetic districts per state; 700 gives ~1.26M monthly rows over 2000-2024.")
+    args = parser.parse_args(argv)
+
+    sections = args.only.split(",") if args.only else list(SECTIONS)
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(sorted(unknown))}")
+
+    results = {}
+    if "rerun" in sections:
+        results["rerun"] = bench_rerun(args.repeat)
+    if "figures" in sections:
+        results["figures"] = bench_figures(args.repeat)
+    if "prompt" in sections:
+        results["prompt"] = bench_prompt(args.repeat)
+    if "chat" in sections:
+        results["chat"] = bench_chat(args.chat_requests, args.mock_delay, args.mock_chunk_delay,
+                                     args.mock_error_rate, args.mock_fail_first, args.mock_error_status)
+    if "chat_rerun" in sections:
+        results["chat_rerun"] = bench_chat_rerun(args.repeat)
+    if "tracing" in sections:
+        results["tracing"] = bench_tracing()
+    if "timeseries" in sections:
+        results["timeseries"] = bench_timeseries(args.repeat, args.timeseries_districts, (2000, 2024))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "data_version": hd.DATA_VERSION,
+            "repeat": args.repeat,
+            "tracing": hd.TRACING,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+# build_timeseries.py
+"""
+Builds the dashboard's time-series store (see TIMESERIES_PATH in
+hospitality_dashboard.py): monthly, district-level arrivals, occupancy and
+ADR as Parquet, plus the state x year, state x month and region x year
+rollups the dashboard queries.
+
+  python build_timeseries.py ingest arrivals.csv [--replace] [--store timeseries/]
+  python build_timeseries.py rebuild [--store timeseries/]
+  python build_timeseries.py synthetic --districts-per-state 20 --years 2005-2024 --store /tmp/ts
+
+Input rows (CSV or Parquet) have the columns state, region, district, year,
+month, domestic_arrivals, foreign_arrivals, occupancy_pct, adr_inr and
+source; occupancy_pct and adr_inr may be empty. `ingest` appends the rows
+(or, with --replace, first drops the stored rows of the years it contains)
+and recomputes the rollups of the affected years only. `synthetic`
+generates clearly labelled synthetic history for load testing; it is not
+report data.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import hospitality_dashboard as hd
+
+RAW_SCHEMA = pa.schema([
+    ("state", pa.string()),
+    ("region", pa.string()),
+    ("district", pa.string()),
+    ("year", pa.int16()),
+    ("month", pa.int8()),
+    ("domestic_arrivals", pa.int64()),
+    ("foreign_arrivals", pa.int64()),
+    ("occupancy_pct", pa.float64()),
+    ("adr_inr", pa.float64()),
+    ("source", pa.string()),
+])
+KEY_COLUMNS = ("state", "region", "district", "year", "month", "source")
+MEAN_COLUMNS = ("occupancy_pct", "adr_inr")
+
+
+def read_rows(path):
+    """Reads input rows from a CSV or Parquet file, cast to RAW_SCHEMA and validated."""
+    if path.endswith(".parquet"):
+        table = pq.read_table(path)
+    else:
+        import pyarrow.csv as pcsv
+        table = pcsv.read_csv(path, convert_options=pcsv.ConvertOptions(column_types=RAW_SCHEMA))
+    missing = [name for name in RAW_SCHEMA.names if name not in table.column_names]
+    if missing:
+        raise ValueError(f"{path}: missing columns {', '.join(missing)}")
+    table = table.select(RAW_SCHEMA.names).cast(RAW_SCHEMA)
+    validate_rows(table)
+    return table
+
+
+def validate_rows(table):
+    """Raises ValueError for rows the rollups cannot use."""
+    for name in KEY_COLUMNS:
+        if table[name].null_count:
+            raise ValueError(f"{table[name].null_count} rows have no {name}")
+    if pc.any(pc.or_(pc.less(table["month"], 1), pc.greater(table["month"], 12))).as_py():
+        raise ValueError("month must be between 1 and 12")
+    for name in ("domestic_arrivals", "foreign_arrivals"):
+        if table[name].null_count or pc.any(pc.less(table[name], 0)).as_py():
+            raise ValueError(f"{name} must be a non-negative count")
+
+
+def aggregate(table, keys):
+    """Rolls rows up by `keys`: arrivals summed, means kept as sum and count."""
+    aggregations = [("domestic_arrivals", "sum"), ("foreign_arrivals", "sum")]
+    for name in MEAN_COLUMNS:
+        aggregations += [(name, "sum"), (name, "count")]
+    aggregations.append(("district", "count"))
+    result = table.group_by(list(keys)).aggregate(aggregations)
+    result = result.rename_columns([
+        {"domestic_arrivals_sum": "domestic_arrivals", "foreign_arrivals_sum": "foreign_arrivals",
+         "district_count": "rows"}.get(name, name) for name in result.column_names])
+    # Sums of empty groups are null; a mean with count 0 is "no data"
+    for name in MEAN_COLUMNS:
+        index = result.column_names.index(f"{name}_sum")
+        result = result.set_column(index, f"{name}_sum", pc.fill_null(result[f"{name}_sum"], 0.0))
+    return result.sort_by([(key, "ascending") for key in keys])
+
+
+def raw_dataset(store):
+    return ds.dataset(os.path.join(store, "raw"), format="parquet", partitioning="hive",
+                      schema=RAW_SCHEMA)
+
+
+def update_rollups(store, years=None):
+    """Recomputes the rollups for `years` (all years when None) from the raw rows."""
+    dataset = raw_dataset(store)
+    if years is None:
+        raw = dataset.to_table()
+    else:
+        raw = dataset.to_table(filter=ds.field("year").isin(sorted(years)))
+    os.makedirs(os.path.join(store, "rollups"), exist_ok=True)
+    for name, keys in hd.TIMESERIES_ROLLUPS.items():
+        path = os.path.join(store, "rollups", f"{name}.parquet")
+        fresh = aggregate(raw, keys)
+        if years is not None and os.path.exists(path):
+            kept = pq.read_table(path)
+            kept = kept.filter(pc.invert(pc.is_in(kept["year"], pa.array(sorted(years), pa.int16()))))
+            fresh = pa.concat_tables([kept, fresh.cast(kept.schema)]).sort_by([(key, "ascending") for key in keys])
+        tmp_path = f"{path}.tmp"
+        pq.write_table(fresh, tmp_path)
+        os.replace(tmp_path, path)
+
+
+def write_manifest(store, new_sources=()):
+    """Writes manifest.json; the dashboard reloads the store when it changes."""
+    manifest_path = os.path.join(store, "manifest.json")
+    sources = set(new_sources)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            sources |= set(json.load(f).get("sources", []))
+    state_year = pq.read_table(os.path.join(store, "rollups", "state_year.parquet"), columns=["year"])
+    manifest = {
+        "schema_version": hd.TIMESERIES_SCHEMA_VERSION,
+        "rows": raw_dataset(store).count_rows(),
+        "first_year": pc.min(state_year["year"]).as_py(),
+        "last_year": pc.max(state_year["year"]).as_py(),
+        "sources": sorted(sources),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def ingest(store, table, replace=False):
+    """Adds `table` to the store and refreshes the rollups of the years it touches."""
+    years = set(pc.unique(table["year"]).to_pylist())
+    if not years:
+        raise ValueError("no rows to ingest")
+    raw_dir = os.path.join(store, "raw")
+    if replace:
+        for year in years:
+            shutil.rmtree(os.path.join(raw_dir, f"year={year}"), ignore_errors=True)
+    ds.write_dataset(
+        table, raw_dir, format="parquet", partitioning=["year"], partitioning_flavor="hive",
+        schema=RAW_SCHEMA, basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore")
+    update_rollups(store, years)
+    return write_manifest(store, pc.unique(table["source"]).to_pylist())
+
+
+def synthetic_rows(districts_per_state, first_year, last_year, seed=0):
+    """
+    Synthetic monthly district history whose latest year roughly matches the
+    report's state totals, with growth, seasonality and noise. Every row is
+    labelled source="synthetic".
+    """
+    rng = np.random.default_rng(seed)
+    arrivals = hd.DATA["Overview"]["Comparative_Arrivals"]
+    states = arrivals["States"]
+    years = np.arange(first_year, last_year + 1)
+    months = np.arange(1, 13)
+    # One row per (state, district, year, month)
+    state_index, district, year, month = (a.ravel() for a in np.meshgrid(
+        np.arange(len(states)), np.arange(districts_per_state), years, months, indexing="ij"))
+    growth = 1.06 ** (year - last_year)
+    season = 1 + 0.35 * np.cos((month - 12) / 12 * 2 * np.pi)
+    share = rng.dirichlet(np.ones(districts_per_state), size=len(states))[state_index, district]
+    noise = rng.lognormal(0, 0.1, size=len(year))
+    base = growth * season / 12 * share * noise * 1e6
+    domestic = np.array(arrivals["Domestic"])[state_index] * base
+    foreign = np.array(arrivals["Foreign"])[state_index] * base
+    state_names = np.array(states)[state_index]
+    return pa.table({
+        "state": state_names,
+        "region": np.where(district % 2 == 0, "Coastal", "Interior"),
+        "district": np.char.add(np.char.add(state_names, " district "), (district + 1).astype(str)),
+        "year": year.astype(np.int16),
+        "month": month.astype(np.int8),
+        "domestic_arrivals": domestic.round().astype(np.int64),
+        "foreign_arrivals": foreign.round().astype(np.int64),
+        "occupancy_pct": np.clip(60 + 12 * (season - 1) + rng.normal(0, 5, len(year)), 5, 100).round(1),
+        "adr_inr": (6000 * growth * rng.lognormal(0, 0.2, len(year))).round(),
+        "source": np.full(len(year), "synthetic"),
+    }, schema=RAW_SCHEMA)
+
+
+def parse_years(text):
+    first, _, last = text.partition("-")
+    return int(first), int(last or first)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--store", default=hd.TIMESERIES_PATH, help="Store directory (default: TIMESERIES_PATH).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = commands.add_parser("ingest", help="Add rows from a CSV or Parquet file.")
+    ingest_parser.add_argument("path")
+    ingest_parser.add_argument("--replace", action="store_true", help="Replace the stored rows of the years in the file.")
+    commands.add_parser("rebuild", help="Recompute every rollup from the raw rows.")
+    synthetic_parser = commands.add_parser("synthetic", help="Generate synthetic history (for load testing).")
+    synthetic_parser.add_argument("--districts-per-state", type=int, default=10)
+    synthetic_parser.add_argument("--years", type=parse_years, default=(2015, 2024), help="e.g. 2005-2024")
+    synthetic_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        if args.command == "ingest":
+            manifest = ingest(args.store, read_rows(args.path), replace=args.replace)
+        elif args.command == "rebuild":
+            update_rollups(args.store)
+            manifest = write_manifest(args.store)
+        else:
+            first_year, last_year = args.years
+            manifest = ingest(args.store, synthetic_rows(args.districts_per_state, first_year, last_year, args.seed),
+                              replace=True)
+    except (OSError, ValueError, pa.ArrowException) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"{args.store}: {manifest['rows']:,} rows, {manifest['first_year']}-{manifest['last_year']} "
+          f"({time.perf_counter() - start:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
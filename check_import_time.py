@@ -0,0 +1,105 @@
+# check_import_time.py
+"""
+Import-time regression check for the dashboard module.
+
+Imports hospitality_dashboard in a fresh interpreter under `python -X
+importtime` and reports how long the import took, split into Streamlit's
+own import and everything else, plus the slowest modules the dashboard
+pulled in on top of Streamlit. Fails when a heavy module that should only
+load on first use (pandas, numpy, requests, pyarrow) is imported, or when
+the dashboard's own share exceeds --max-ms.
+
+  python check_import_time.py [--max-ms 150] [--runs 3]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+LAZY_MODULES = ("pandas", "numpy", "requests", "pyarrow")
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure():
+    """
+    Returns the parsed -X importtime entries (self_us, cumulative_us, depth,
+    module) of one import. Raises RuntimeError with the import's error output
+    if it fails.
+    """
+    # Run next to the module, so the check works from any directory
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import hospitality_dashboard"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        errors = "\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))
+        raise RuntimeError(f"import hospitality_dashboard failed (exit {result.returncode}):\n{errors}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            entries.append((int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2, match.group(4)))
+    return entries
+
+
+def subtree(entries, root):
+    """Names of the modules imported while importing `root` (importtime lists children before their parent)."""
+    index = next(i for i, entry in enumerate(entries) if entry[3] == root)
+    depth = entries[index][2]
+    names = set()
+    for _, _, child_depth, name in reversed(entries[:index]):
+        if child_depth <= depth:
+            break
+        names.add(name)
+    return names
+
+
+def summarize(entries):
+    by_name = {name: (self_us, cumulative_us) for self_us, cumulative_us, _, name in entries}
+    total_us = by_name["hospitality_dashboard"][1]
+    streamlit_us = by_name.get("streamlit", (0, 0))[1]
+    dashboard_tree = subtree(entries, "hospitality_dashboard") | {"hospitality_dashboard"}
+    if "streamlit" in by_name:
+        dashboard_tree -= subtree(entries, "streamlit") | {"streamlit"}
+    extra = sorted(((self_us, name) for self_us, _, _, name in entries if name in dashboard_tree), reverse=True)
+    return {
+        "total_ms": total_us / 1000,
+        "streamlit_ms": streamlit_us / 1000,
+        "dashboard_ms": (total_us - streamlit_us) / 1000,
+        "slowest": [(name, self_us / 1000) for self_us, name in extra[:10]],
+        "lazy_imported": [name for name in LAZY_MODULES if name in by_name],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-ms", type=float, default=150.0,
+                        help="Budget for the import excluding Streamlit itself (default: 150).")
+    parser.add_argument("--runs", type=int, default=3, help="Imports to measure; the fastest counts (default: 3).")
+    args = parser.parse_args(argv)
+
+    try:
+        runs = [summarize(measure()) for _ in range(args.runs)]
+    except RuntimeError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    best = min(runs, key=lambda run: run["dashboard_ms"])
+    print(f"import hospitality_dashboard: {best['total_ms']:.1f} ms "
+          f"(streamlit {best['streamlit_ms']:.1f} ms, dashboard and other modules {best['dashboard_ms']:.1f} ms)")
+    print("Slowest modules outside Streamlit (self time):")
+    for name, ms in best["slowest"]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    if best["lazy_imported"]:
+        print(f"FAIL modules that should load on first use were imported: {', '.join(best['lazy_imported'])}")
+        failed = True
+    if best["dashboard_ms"] > args.max_ms:
+        print(f"FAIL import took {best['dashboard_ms']:.1f} ms outside Streamlit, over the {args.max_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# check_retries.py
+"""
+Checks post_gemini()'s retries, deadline and circuit breaker against
+mock_gemini_server's fault injection.
+
+Each scenario starts a fresh mock server and fresh breaker and rate limiter,
+sends one or more requests and checks the outcome, the number of requests
+the mock received and the breaker state afterwards. Exits non-zero if any
+scenario fails.
+
+  python check_retries.py [--verbose]
+"""
+import argparse
+import sys
+import time
+
+import hospitality_dashboard as hd
+import mock_gemini_server as mock
+
+BODY = {"contents": [{"role": "user", "parts": [{"text": "Which state had the most domestic arrivals?"}]}]}
+
+
+def fresh(**settings):
+    """Applies module settings and drops the cached breaker and rate limiter so they pick them up."""
+    defaults = {"CHAT_MAX_ATTEMPTS": 5, "CHAT_RETRY_DEADLINE_SECONDS": 5.0, "CIRCUIT_FAILURE_THRESHOLD": 5,
+                "CIRCUIT_RESET_SECONDS": 0.5, "CHAT_RATE_LIMIT_RPM": 0}
+    for name, value in dict(defaults, **settings).items():
+        setattr(hd, name, value)
+    hd.get_circuit_breaker.clear()
+    hd.get_rate_limiter.clear()
+
+
+def send(base, stream=False):
+    """Sends BODY through post_gemini(). Returns (ok, message)."""
+    method = "streamGenerateContent?alt=sse&key=mock" if stream else "generateContent?key=mock"
+    try:
+        response = hd.post_gemini(f"{base}/models/{hd.GEMINI_MODEL}:{method}", BODY, stream=stream)
+    except hd.GeminiRequestError as e:
+        return False, str(e)
+    with response:
+        response.content  # read the whole answer, streamed or not
+    return True, ""
+
+
+def requests_received(server):
+    return server.RequestHandlerClass.stats["requests"]
+
+
+def scenario(name, **faults):
+    """Runs the decorated check against a fresh mock started with `faults`."""
+    def register(check):
+        SCENARIOS.append((name, faults, check))
+        return check
+    return register
+
+
+SCENARIOS = []
+
+
+@scenario("transient 503s are retried, honouring Retry-After", fail_first=2, retry_after=0.1)
+def check_retry_after(server, base):
+    fresh()
+    ok, message = send(base)
+    return [ok, requests_received(server) == 3, hd.get_circuit_breaker().state == "closed"]
+
+
+@scenario("client errors fail without retrying", fail_first=1, error_status=400)
+def check_client_error(server, base):
+    fresh()
+    ok, message = send(base)
+    return [not ok, "HTTP 400" in message, requests_received(server) == 1]
+
+
+@scenario("429 on a streamed request is retried", fail_first=1, error_status=429, retry_after=0.1)
+def check_stream_retry(server, base):
+    fresh()
+    ok, _ = send(base, stream=True)
+    return [ok, requests_received(server) == 2]
+
+
+@scenario("a Retry-After beyond the deadline stops retrying", fail_first=1, retry_after=60)
+def check_retry_after_deadline(server, base):
+    fresh()
+    start = time.monotonic()
+    ok, _ = send(base)
+    return [not ok, requests_received(server) == 1, time.monotonic() - start < 1]
+
+
+@scenario("an attempt is cut off at the deadline", delay=2.0)
+def check_attempt_deadline(server, base):
+    fresh(CHAT_RETRY_DEADLINE_SECONDS=0.5)
+    start = time.monotonic()
+    ok, _ = send(base)
+    return [not ok, time.monotonic() - start < 1.5]
+
+
+@scenario("a slow answer within the default deadline succeeds", delay=1.0)
+def check_slow_answer(server, base):
+    fresh(CHAT_RETRY_DEADLINE_SECONDS=hd.CHAT_REQUEST_TIMEOUT_SECONDS + 30)
+    ok, _ = send(base)
+    return [ok, requests_received(server) == 1]
+
+
+@scenario("persistent failures open the breaker, which then fails fast and recovers", error_rate=1.0, retry_after=0.01)
+def check_breaker(server, base):
+    fresh()
+    breaker = hd.get_circuit_breaker()
+    ok, _ = send(base)
+    opened = breaker.state == "open"
+    sent = requests_received(server)
+    fast_ok, fast_message = send(base)
+    results = [not ok, sent == hd.CHAT_MAX_ATTEMPTS, opened, not fast_ok, "paused" in fast_message,
+               requests_received(server) == sent]
+    server.RequestHandlerClass.config.error_rate = 0.0
+    time.sleep(hd.CIRCUIT_RESET_SECONDS)
+    probe_ok, _ = send(base)
+    return results + [probe_ok, breaker.state == "closed"]
+
+
+@scenario("a half-open probe that runs out of time in the rate limiter releases the breaker")
+def check_probe_released(server, base):
+    fresh(CHAT_RETRY_DEADLINE_SECONDS=0.3)
+    breaker = hd.get_circuit_breaker()
+    for _ in range(hd.CIRCUIT_FAILURE_THRESHOLD):
+        breaker.record_failure()
+    time.sleep(hd.CIRCUIT_RESET_SECONDS)
+    # One request a second with its only token spent: the probe would have to wait past its deadline
+    limiter = hd.TokenBucket(1.0, 1)
+    limiter.acquire()
+    original = hd.get_rate_limiter
+    hd.get_rate_limiter = lambda: limiter
+    try:
+        ok, _ = send(base)
+    finally:
+        hd.get_rate_limiter = original
+    starved = [not ok, requests_received(server) == 0, breaker.state == "half-open"]
+    # The next request must be allowed to probe, and its success closes the breaker
+    next_ok, _ = send(base)
+    return starved + [next_ok, breaker.state == "closed"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--verbose", action="store_true", help="Show which condition of a failing scenario failed.")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for name, faults, check in SCENARIOS:
+        server, base = mock.start_in_background(**faults)
+        try:
+            results = check(server, base)
+        finally:
+            server.shutdown()
+        passed = all(results)
+        failures += not passed
+        print(f"{'PASS' if passed else 'FAIL'} {name}" + ("" if passed or not args.verbose else f" {results}"))
+    print(f"Retry checks: {len(SCENARIOS) - failures}/{len(SCENARIOS)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+# evaluate_router.py
+"""
+Accuracy check for the chatbot's structured-query fast path.
+
+Runs every question in router_eval.json through route_question() and
+answer_structured_query() and reports how many were routed to the expected
+intent (null = must fall back to the model) and produced an answer
+containing the expected facts and none of the excluded ones. A routed case
+with "answered": false must still fall back to the model, e.g. when the
+report has no figure for the year it asks about.
+
+  python evaluate_router.py [--eval-set router_eval.json] [--min-accuracy 1.0]
+"""
+import argparse
+import json
+import sys
+
+import hospitality_dashboard as hd
+
+
+def evaluate(cases):
+    failures = []
+    for case in cases:
+        route = hd.route_question(case["question"], hd.STATE_NAMES)
+        intent = route["intent"] if route else None
+        answer = hd.answer_structured_query(case["question"]) or ""
+        missing = [fact for fact in case.get("answer_contains", []) if fact not in answer]
+        missing += [f"not {fact}" for fact in case.get("answer_excludes", []) if fact in answer]
+        if case.get("answered", case["intent"] is not None) != bool(answer):
+            missing.append("an answer" if answer == "" else "a fallback to the model")
+        if intent != case["intent"] or missing:
+            failures.append({"question": case["question"], "expected": case["intent"], "got": intent, "missing": missing})
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--eval-set", default="router_eval.json")
+    parser.add_argument("--min-accuracy", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    with open(args.eval_set, encoding="utf-8") as f:
+        cases = json.load(f)
+    failures = evaluate(cases)
+    accuracy = (len(cases) - len(failures)) / len(cases)
+    for failure in failures:
+        print(f"FAIL {failure['question']!r}: expected {failure['expected']}, got {failure['got']}, missing {failure['missing']}")
+    print(f"Router accuracy: {len(cases) - len(failures)}/{len(cases)} ({accuracy:.0%})")
+    return 0 if accuracy >= args.min_accuracy else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
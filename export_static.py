@@ -0,0 +1,179 @@
+# export_static.py
+"""
+Pre-renders the dashboard's Overview and state pages to static HTML, so
+read-only viewers can be served from any file server instead of holding a
+live Streamlit session.
+
+  python export_static.py --out site/
+
+Writes one page per view (overview.html, kerala.html, ...; index.html is
+the overview) plus a single shared plotly.min.js that every page loads.
+Figures come from the same cached builders as the app, metrics and tables
+from the same report data, so a re-export after a data refresh matches the
+live dashboard. The chatbot is not exported.
+"""
+import argparse
+import html
+import os
+import sys
+
+import plotly.offline
+
+import hospitality_dashboard as hd
+
+PLOTLY_BUNDLE = "plotly.min.js"
+
+PAGE_STYLE = """
+body { font-family: "Source Sans Pro", -apple-system, "Segoe UI", sans-serif; color: #31333f; margin: 0; }
+nav { display: flex; flex-wrap: wrap; gap: 4px; padding: 8px 24px; border-bottom: 1px solid #e6e6e6; }
+nav a { padding: 6px 12px; border-radius: 6px; color: #31333f; text-decoration: none; }
+nav a.active { background: #f0f2f6; font-weight: 600; }
+main { max-width: 1280px; margin: 0 auto; padding: 16px 24px 48px; }
+hr { border: none; border-top: 1px solid #e6e6e6; margin: 24px 0; }
+.row { display: flex; flex-wrap: wrap; gap: 16px; }
+.row > * { flex: 1 1 0; min-width: 200px; }
+table { border-collapse: collapse; width: 100%; font-size: 14px; }
+th, td { border: 1px solid #e6e6e6; padding: 6px 8px; text-align: left; vertical-align: top; }
+th { background: #f0f2f6; }
+code { background: #f0f2f6; padding: 1px 4px; border-radius: 4px; }
+"""
+
+
+def paragraph(text):
+    return f"<p>{hd.inline_markdown_html(' '.join(text.split()))}</p>"
+
+
+def table(headers, rows):
+    head = "".join(f"<th>{html.escape(h)}</th>" for h in headers)
+    body = "".join("<tr>" + "".join(f"<td>{html.escape(str(cell))}</td>" for cell in row) + "</tr>" for row in rows)
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+
+def figure(builder_name, data):
+    fig = hd.get_figure(builder_name, data)
+    return fig.to_html(full_html=False, include_plotlyjs=False, config={"displaylogo": False})
+
+
+def render_overview(data):
+    overview = data['Overview']
+    parts = [
+        "<h1>South India Travel Intelligence Dashboard</h1>",
+        paragraph(f"**Source:** *{hd.REPORT_SOURCE}*"),
+        "<hr>",
+        "<h3>Executive Overview: The Structural Schism</h3>",
+        paragraph(overview['Intro']),
+        hd.card_grid_html(
+            hd.metric_card_html(item['Metric'], item['Value'], help_text=f"Source: [cite: {item['Source']}]")
+            for item in overview['Market_Growth']),
+        paragraph("**The New Value Equation: Return on Experience (ROE)**"),
+        paragraph(hd.ROE_TEXT),
+        hd.card_grid_html(
+            hd.info_card_html(f"**{item['Value']}** {item['Metric']} [cite: {item['Source']}]")
+            for item in overview['Traveler_Values']),
+        "<hr>",
+        "<h3>Quantitative State Comparison</h3>",
+        figure("comparative_arrivals", overview['Comparative_Arrivals']),
+        paragraph("**Comparative Hospitality KPIs (2023-2024)**"),
+        table(overview['Hospitality_KPIs']['headers'], overview['Hospitality_KPIs']['rows']),
+        "<hr>",
+        "<h3>Qualitative State Comparison</h3>",
+        '<div class="row"><div style="flex-grow: 1.2">',
+        paragraph(f"**Cross-State Traveller Profile & Motivation Matrix [cite: {overview['Archetype_Matrix']['source']}]**"),
+        table(overview['Archetype_Matrix']['headers'], overview['Archetype_Matrix']['rows']),
+        "</div><div>",
+        figure("sentiment_radar", overview['Sentiment_Radar']),
+        "</div></div>",
+    ]
+    return "\n".join(parts)
+
+
+def render_state(state_data, state_table):
+    values = state_table.select(section="Metrics", kind="value")
+    deltas = state_table.select(section="Metrics", kind="delta")
+    other_metrics = state_table.select(section="Other_Metrics")
+    parts = [
+        f"<h2>{html.escape(state_data['Tagline'])}</h2>",
+        "<hr>",
+        "<h3>Key Quantitative Indicators</h3>",
+        hd.card_grid_html(
+            hd.metric_card_html(str(values.label[i]), values.display(i), deltas.display(i)) for i in range(len(values))),
+        paragraph("**Hospitality & Policy Metrics:**"),
+        "<ul>" + "".join(
+            f"<li>{hd.inline_markdown_html(f'**{other_metrics.label[i]}:** {other_metrics.display(i)}')}</li>"
+            for i in range(len(other_metrics))) + "</ul>",
+        "<hr>",
+        '<div class="row"><div>',
+        "<h3>Emotional &amp; Behavioural Patterns</h3>",
+        paragraph(f"**Primary Archetype: {state_data['Archetype']['Name']}**"),
+        paragraph(f"**Motivations:** {state_data['Archetype']['Motivations']}"),
+        paragraph(f"**Key Sentiment Keywords:** {state_data['Archetype']['Keywords']}"),
+        "</div><div>",
+        "<h3>Emotional Tones by Micro-Destination</h3>",
+        "".join(paragraph(f"**{dest}:** {tone}") for dest, tone in state_data['Micro_Destinations'].items()),
+        "<hr>",
+        "<h3>Accessibility &amp; Infrastructure</h3>",
+        paragraph(f"**Airports:** {state_data['Infrastructure']['Airports']}"),
+        paragraph(f"**Road Network:** {state_data['Infrastructure']['Highways']}"),
+        "</div></div>",
+    ]
+    return "\n".join(parts)
+
+
+def page(title, body, pages, current):
+    nav = "".join(
+        f'<a href="{path}.html"{" class=active" if path == current else ""}>{html.escape(name)}</a>'
+        for name, path in pages)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(title)} · South India Tourism Intelligence Dashboard</title>
+<script src="{PLOTLY_BUNDLE}"></script>
+<style>{PAGE_STYLE}</style>
+</head>
+<body>
+<nav>{nav}</nav>
+<main>
+{body}
+</main>
+</body>
+</html>
+"""
+
+
+def export(out_dir):
+    """Writes every page and the shared plotly.js bundle to out_dir. Returns the written paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    data, version = hd.DATA, hd.DATA_VERSION
+    table_all = hd.get_report_table(version, data)
+    pages = [("South India Overview", "overview")] + [(state, hd.state_url_path(state)) for state in hd.STATE_NAMES]
+
+    rendered = {"overview": page("South India Overview", render_overview(data), pages, "overview")}
+    for state in hd.STATE_NAMES:
+        path = hd.state_url_path(state)
+        rendered[path] = page(state, render_state(data[state], table_all.select(state=state)), pages, path)
+    rendered["index"] = rendered["overview"]
+
+    written = []
+    for path, content in rendered.items():
+        written.append(os.path.join(out_dir, f"{path}.html"))
+        with open(written[-1], "w", encoding="utf-8") as f:
+            f.write(content)
+    written.append(os.path.join(out_dir, PLOTLY_BUNDLE))
+    with open(written[-1], "w", encoding="utf-8") as f:
+        f.write(plotly.offline.get_plotlyjs())
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the dashboard's Overview and state pages as static HTML.")
+    parser.add_argument("--out", default="site", help="Output directory (default: site/).")
+    args = parser.parse_args(argv)
+    for path in export(args.out):
+        print(f"{path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
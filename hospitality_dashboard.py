@@ -1,269 +1,758 @@
 # dashboard_app.py
 import streamlit as st
-import plotly.graph_objects as go
-import pandas as pd
-import requests
+# plotly, numpy and requests are imported where they are first used, so a
+# worker starts without them and each view loads only what it renders
+import bisect
+import contextlib
+import functools
+import hashlib
+import html
+import inspect
 import json
+import logging
+import math
+import os
+import queue
+import random
+import re
+import threading
 import time
+import uuid
+import zlib
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+if not runtime.exists():
+    # Imported by a command-line tool rather than `streamlit run`: caches fall
+    # back to in-memory storage, which Streamlit warns about on every use
+    from streamlit import config, logger
+    config.get_option("logger.level")  # parse the config first so it cannot reset the level
+    logger.set_log_level("error")
 
 # ----------------------------------------------------------------------
-# Page Configuration
+# Configuration
 # ----------------------------------------------------------------------
-st.set_page_config(
-    page_title="South India Tourism Intelligence Dashboard",
-    layout="wide",
-    initial_sidebar_state="collapsed"
-)
+
+def get_setting(name, default=None):
+    """Reads a setting from the environment, falling back to Streamlit secrets."""
+    value = os.environ.get(name)
+    if value is not None:
+        return value
+    try:
+        return st.secrets.get(name, default)
+    except FileNotFoundError:
+        # No secrets.toml is configured
+        return default
+
+# ----------------------------------------------------------------------
+# Telemetry
+# ----------------------------------------------------------------------
+
+# TRACING=true times every view, plot function, prompt build, chat call and
+# Gemini HTTP attempt. Timings and chat request details are aggregated into
+# process-wide histograms, served in Prometheus text format on METRICS_PORT
+# (/metrics) and/or written to METRICS_FILE (e.g. for node_exporter's
+# textfile collector). Setting either one turns tracing on. With tracing off,
+# @traced functions are left undecorated and span() returns a shared no-op.
+METRICS_PORT = int(get_setting("METRICS_PORT", 0))
+METRICS_HOST = get_setting("METRICS_HOST", "127.0.0.1")
+METRICS_FILE = get_setting("METRICS_FILE")
+METRICS_FILE_INTERVAL_SECONDS = float(get_setting("METRICS_FILE_INTERVAL_SECONDS", 15))
+TRACING = str(get_setting("TRACING", "true" if METRICS_PORT or METRICS_FILE else "false")).lower() == "true"
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = tuple(256 * 4 ** i for i in range(9))  # 256 B .. 16 MiB
+TOKENS_BUCKETS = tuple(64 * 4 ** i for i in range(8))  # 64 .. 1M
+RETRIES_BUCKETS = (0, 1, 2, 3, 4, 5, 10)
+
+METRIC_HELP = {
+    "dashboard_span_seconds": "Duration of traced dashboard operations (views, plots, prompts, chat calls, reruns).",
+    "gemini_attempt_seconds": "Duration of individual Gemini HTTP attempts, by response status.",
+    "gemini_request_bytes": "Size of Gemini request bodies.",
+    "gemini_retries": "Retries needed per Gemini request.",
+    "gemini_tokens": "Token counts reported in the Gemini response usageMetadata.",
+    "figure_payload_bytes": "Serialized size of each figure sent to the browser, by figure.",
+}
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (not thread-safe on its own)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Thread-safe set of labelled histograms, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # name -> {sorted label items: Histogram}
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    labels = ",".join(f'{label}="{value}"' for label, value in key)
+                    prefix = labels + "," if labels else ""
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+                    suffix = f"{{{labels}}}" if labels else ""
+                    lines.append(f"{name}_sum{suffix} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{suffix} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_registry():
+    return MetricsRegistry()
+
+# Spans finished on the script thread during the current rerun (None outside trace_rerun)
+_rerun_trace = threading.local()
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        get_metrics_registry().observe("dashboard_span_seconds", elapsed, span=self.name)
+        spans = getattr(_rerun_trace, "spans", None)
+        if spans is not None:
+            spans.append((self.name, elapsed))
+        return False
+
+_NULL_SPAN = contextlib.nullcontext()
+
+def span(name):
+    """Context manager timing a block as span `name` (a shared no-op when tracing is off)."""
+    return _Span(name) if TRACING else _NULL_SPAN
+
+def traced(name=None):
+    """Decorator timing every call of a function (or generator) as a span."""
+    def decorate(fn):
+        if not TRACING:
+            return fn
+        span_name = name or fn.__name__
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with _Span(span_name):
+                    return (yield from fn(*args, **kwargs))
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with _Span(span_name):
+                    return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+@contextlib.contextmanager
+def trace_rerun():
+    """Times one script run and logs the breakdown of its spans at DEBUG level."""
+    if not TRACING:
+        yield
+        return
+    _rerun_trace.spans = []
+    try:
+        with _Span("rerun"):
+            yield
+    finally:
+        spans, _rerun_trace.spans = _rerun_trace.spans, None
+        logging.getLogger(__name__).debug("Rerun trace: %s", ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in spans))
+
+def record_usage(usage_metadata):
+    """Records the token counts of a Gemini response's usageMetadata."""
+    if not TRACING or not usage_metadata:
+        return
+    registry = get_metrics_registry()
+    for field, kind in (("promptTokenCount", "prompt"), ("candidatesTokenCount", "candidates"),
+                        ("cachedContentTokenCount", "cached"), ("totalTokenCount", "total")):
+        if field in usage_metadata:
+            registry.observe("gemini_tokens", usage_metadata[field], TOKENS_BUCKETS, kind=kind)
+
+def write_metrics_file(registry, path):
+    """Atomically replaces `path` with the current metrics."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_exporters():
+    """Starts the METRICS_PORT endpoint and the METRICS_FILE writer, once per process."""
+    registry = get_metrics_registry()
+    if METRICS_PORT:
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((METRICS_HOST, METRICS_PORT), MetricsHandler)
+        except OSError as e:
+            # e.g. another worker on this host already serves METRICS_PORT; the app runs without it
+            logging.getLogger(__name__).warning("Could not serve metrics on %s:%s: %s", METRICS_HOST, METRICS_PORT, e)
+        else:
+            threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    if METRICS_FILE:
+        def write_periodically():
+            while True:
+                time.sleep(METRICS_FILE_INTERVAL_SECONDS)
+                try:
+                    write_metrics_file(registry, METRICS_FILE)
+                except OSError as e:
+                    logging.getLogger(__name__).warning("Could not write metrics to %s: %s", METRICS_FILE, e)
+
+        threading.Thread(target=write_periodically, name="metrics-file", daemon=True).start()
+    return registry
 
 # ----------------------------------------------------------------------
 # Data Store (Extracted *only* from the provided document)
 # ----------------------------------------------------------------------
 
-# This dictionary holds all data extracted *verbatim* from the document.
-# All citations refer to the source document provided.
-DATA = {
-    "Overview": {
-        "Intro": """
-        The South Indian hospitality market is undergoing a structural divergence. 
-        Analysis indicates a shift where legacy luxury faces commoditization, while a new traveler 
-        archetype drives demand for authenticity, exclusivity, and deep experiential engagement. 
-        This validates a strategic focus on **"Destination-Based Signature Stays"**.
-        """,
-        "Market_Growth": [
-            {"Metric": "Baseline India Boutique Hotel Market CAGR (2024-2030)", "Value": "9.6%", "Source": 5},
-            {"Metric": "Eco-Wellness Lodges Niche CAGR", "Value": "21.62%", "Source": 6}
-        ],
-        "Traveler_Values": [
-            {"Metric": "Affluent travelers preferring luxury travel over lavish weddings", "Value": "81%", "Source": 13},
-            {"Metric": "Affluent travelers preferring luxury travel over designer goods", "Value": "74%", "Source": 13},
-            {"Metric": "Primary motivation: 'Fun and adventure'", "Value": "48%", "Source": 13},
-            {"Metric": "Primary motivation: 'Cultural discovery'", "Value": "47%", "Source": 13}
-        ],
-        "Comparative_Arrivals": {
-            "States": ["Kerala", "Tamil Nadu", "Karnataka", "Goa", "Andhra Pradesh", "Telangana"],
-            "Domestic": [22.2, 286.0, 283.5, 9.9, 254.7, 60.7],
-            "Domestic_Source": [19, 39, 56, 75, 98, 117],
-            "Domestic_Year": ["(2024)", "(2023)", "(2023)", "(2024)", "(2023)", "(2022)"],
-            "Foreign": [0.74, 1.17, 0.401, 0.47, 0.06, 0.16],
-            "Foreign_Source": [19, 39, 56, 75, 98, 117],
-            "Foreign_Year": ["(2024)", "(2023)", "(2024)", "(2024)", "(2023)", "(2023)"]
-        },
-        "Hospitality_KPIs": {
-            "headers": ["State", "Key City", "Occupancy (%)", "ADR (₹)", "Key Revenue / Metric"],
-            "rows": [
-                ["Kerala", "Kochi (Aug 2024)", "62-64%", "₹6,900 - ₹7,100", "₹43,621.22 Cr (Total Revenue 2023)"],
-                ["Tamil Nadu", "Chennai (Jul 2024)", "76-79%", "₹6,900 - ₹7,100 (Aug 2024)", "₹243.31 Cr (TTDC Revenue FY24)"],
-                ["Karnataka", "Bengaluru (Aug 2024)", "Strong (Data Not Available)", "₹6,900 - ₹7,100", "₹100 Cr (Mysore Dasara Turnover)"],
-                ["Goa", "Overall (Jul 2024)", "Range-bound (Data Not Available)", "> ₹8,500", "16.43% (Tourism GSDP Contribution)"],
-                ["Andhra Pradesh", "N/A", "Data Not Available", "Data Not Available", "₹161.45 Cr (APTDCL Income FY24)"],
-                ["Telangana", "Hyderabad (FY 2023-24)", "Among highest in India", "High Growth (Data Not Available)", "+11.9% (RevPAR Growth Q2 2024)"]
-            ]
-        },
-        "Archetype_Matrix": {
-            "headers": ["State", "Primary Traveller Archetype(s)", "Dominant Motivations", "Key Sentiment Keywords", "Hospitality Maturity"],
-            "rows": [
-                ["Kerala", "Wellness Seeker, Nature/Adventure", "Rejuvenation, Transformation, Adventure", "'Tranquil,' 'Lush,' 'Serene,' 'Authentic'", "Mature (Wellness), Developing (Adventure)"],
-                ["Tamil Nadu", "Cultural Purist, Spiritual", "Discovery, Authenticity, Culinary Immersion", "'Heritage,' 'Opulent,' 'Vintage,' 'Unspoiled'", "Niche/Mature (Heritage), Emerging (Eco)"],
-                ["Karnataka", "Cultural/Spiritual, Nature/Adventure, Wellness", "Discovery, Thrill, Rejuvenation, Workation", "'Spiritual,' 'Tranquil,' 'Overcrowded' (Coorg)", "Mature (Coorg), Ascendant (Gokarna, Hampi)"],
-                ["Goa", "Celebration/Event, Luxury/Escape", "Celebration, Relaxation, Seclusion", "'Crowded' (North), 'Peaceful,' 'Secluded' (South)", "Mature/Saturated (North), Mature/Premium (South)"],
-                ["Andhra Pradesh", "Cultural/Spiritual", "Pilgrimage, Discovery", "'Well-managed' (tours), 'Poor food,' 'Bad service' (hotels)", "Developing/Nascent (Premium)"],
-                ["Telangana", "Business/MICE, Cultural/Heritage, Celebration", "Business, Discovery, Celebration", "'Fairytale,' 'Breathtaking' (Weddings), 'Scheduling issues' (Tours)", "Mature (Hyderabad MICE), Developing (Leisure)"]
-            ],
-            "source": 136
-        },
-        "Sentiment_Radar": {
-            "Categories": ['Cultural/Spiritual', 'Wellness/Rejuvenation', 'Nature/Escape', 'Adventure', 'Celebration/MICE'],
-            "States": {
-                "Kerala": [0, 3, 3, 2, 0],
-                "Tamil Nadu": [2, 1, 2, 0, 0],
-                "Karnataka": [2, 2, 3, 2, 1],
-                "Goa": [1, 1, 3, 2, 1],
-                "Andhra Pradesh": [2, 0, 3, 1, 0],
-                "Telangana": [2, 0, 1, 1, 2]
-            }
-        }
-    },
-    "Kerala": {
-        "Tagline": "The Wellness Epicenter",
-        "Metrics": [
-            {"label": "Domestic Arrivals (2024)", "value": "22.2 Million", "delta": "+1.72% YoY"},
-            {"label": "Foreign Arrivals (2024)", "value": "0.74 Million", "delta": "+13.76% YoY"},
-            {"label": "Total Tourism Revenue (2023)", "value": "₹43,621.22 Cr", "delta": "+24.03% YoY"},
-        ],
-        "Other_Metrics": [
-            "**Kochi Hotel Occupancy (Aug 2024):** 62-64%",
-            "**Kochi Hotel ADR (Aug 2024):** ₹6,900 - ₹7,100",
-            "**Share of India's Wellness Market (2025):** 45.64%",
-            "**Foreign Arrivals vs. 2019:** -37.9%"
-        ],
-        "Archetype": {
-            "Name": "Wellness Seeker / Holistic Seeker",
-            "Motivations": "A purposeful journey of rejuvenation, transformation, and a 'mental reset'.",
-            "Keywords": "`magical land`, `lush green mountains`, `pristine`, `tranquil backwaters`, `peaceful environment`"
-        },
-        "Micro_Destinations": {
-            "Varkala": "Rejuvenation/Wellness",
-            "Wayanad": "Nature/Adventure & Rejuvenation/Wellness",
-            "Vagamon": "Nature/Adventure",
-            "Munroe Island": "Nature/Escape"
-        },
-        "Infrastructure": {
-            "Airports": "4 International Airports: Trivandrum (TRV), Cochin (COK), Calicut (CCJ), Kannur (CNN)",
-            "Highways": "NH-66 (coastal), NH-544 (Salem-Kochi), NH-766 (Wayanad access)"
-        }
-    },
-    "Tamil Nadu": {
-        "Tagline": "The Cultural Heartland",
-        "Metrics": [
-            {"label": "Domestic Arrivals (2023)", "value": "286 Million", "delta": "+30.8% vs 2022"},
-            {"label": "Foreign Arrivals (2023)", "value": "1.17 Million", "delta": "+735% vs 2022"},
-            {"label": "TTDC Revenue (FY 2023-24)", "value": "₹243.31 Cr", "delta": "Fivefold increase from FY 2020-21"},
-        ],
-        "Other_Metrics": [
-            "**Chennai Hotel Occupancy (Jul 2024):** 76-79%",
-            "**Chennai Hotel ADR (Aug 2024):** ₹6,900 - ₹7,100",
-            "**Policy Target (GDP):** Increase tourism's GDP contribution to 12% by 2030",
-            "**Policy Target (Avg. Spend):** Increase domestic spend from ₹1,700 to ₹25,000"
-        ],
-        "Archetype": {
-            "Name": "Cultural Purist / Connoisseur",
-            "Motivations": "Discovery, authenticity, and a deep connection to history, living culture, and architecture.",
-            "Keywords": "`vintage luxury`, `rural charm`, `opulent mansions`, `feisty food`, `culturally rich`, `unspoiled by large crowds`"
-        },
-        "Micro_Destinations": {
-            "Chettinad": "Cultural and Culinary Immersion",
-            "Valparai": "Nature/Escape",
-            "Kotagiri (Nilgiris)": "Rejuvenation/Nature"
-        },
-        "Infrastructure": {
-            "Airports": "4 International Airports: Chennai (MAA), Coimbatore (CJB), Tiruchirappalli (TRZ), Madurai (IXM)",
-            "Highways": "NH-32 (East Coast Road), NH-44 (North-South)"
-        }
-    },
-    "Karnataka": {
-        "Tagline": "The Diverse Powerhouse",
-        "Metrics": [
-            {"label": "Domestic Arrivals (2023)", "value": "283.5 Million", "delta": "+55.4% vs 2022"},
-            {"label": "Foreign Arrivals (2024)", "value": ">401,000", "delta": "Data Not Available"},
-            {"label": "Mysore Dasara (2025) Turnover", "value": "₹100 Crore", "delta": "from ~500,000 tourists"},
-        ],
-        "Other_Metrics": [
-            "**Tourism Employment Share:** 10% of total state jobs",
-            "**Mysore Hotel Occupancy (Dasara Peak):** 100%",
-            "**Bengaluru Hotel ADR (Aug 2024):** ₹6,900 - ₹7,100"
-        ],
-        "Archetype": {
-            "Name": "Cultural Purist, Adventure Capitalist, Wellness Seeker",
-            "Motivations": "Discovery (Hampi), Thrill (Western Ghats), Rejuvenation (Coorg), 'Workations' (fueled by Bengaluru).",
-            "Keywords": "**Coorg (Negative):** `overcrowded`, `traffic`, `overhyped`. **Gokarna (Positive):** `quieter`, `tranquil vibe`"
-        },
-        "Micro_Destinations": {
-            "Hampi": "Cultural/Spiritual",
-            "Coorg": "Nature/Wellness/Celebration",
-            "Gokarna": "Spiritual/Wellness & Nature/Escape",
-            "Chorla Ghats": "Nature/Adventure & Luxury/Escape"
-        },
-        "Infrastructure": {
-            "Airports": "Major Airports: Bengaluru (BLR), Mangalore (IXE), Mysore (MYQ), Hubli (HBX)",
-            "Highways": "NH-44, NH-48, NH-66. **Key Project:** NH-67 four-laning to Hampi (projected 60% travel time reduction)"
-        }
-    },
-    "Goa": {
-        "Tagline": "The Bifurcated Leisure Market",
-        "Metrics": [
-            {"label": "Domestic Arrivals (2024)", "value": "9.9 Million", "delta": "+22% YoY"},
-            {"label": "Foreign Arrivals (2024)", "value": "0.47 Million", "delta": "+3% YoY"},
-            {"label": "Tourism GSDP Contribution", "value": "16.43%", "delta": "Employs ~35% of population"},
-        ],
-        "Other_Metrics": [
-            "**Overall ADR (Jul 2024):** > ₹8,500",
-            "**Rate Correction (2025, North Goa):** -15% to -20%",
-            "**Rate Correction (2025, South Goa):** -5% to -7%",
-            "**Luxury Villa Rental Yield (North):** 6-10% per annum"
-        ],
-        "Archetype": {
-            "Name": "Celebration/Event-driven (North), Luxury/Escape (South)",
-            "Motivations": "Celebration, Relaxation, Seclusion.",
-            "Keywords": "**North Goa (Negative):** `crowded`, `noisy`, `overtourism`. **South Goa (Positive):** `peaceful`, `secluded`, `tranquility`, `serenity`"
-        },
-        "Micro_Destinations": {
-            "North Goa": "High-volume, mass-market (Negative Sentiment)",
-            "South Goa": "Luxury/Escape (Positive Sentiment)",
-            "Hinterlands (Chorla, Divar)": "Nature/Adventure, Luxury/Escape, Cultural/Heritage"
-        },
-        "Infrastructure": {
-            "Airports": "2 International Airports: Dabolim (GOI) and Manohar (GOX) at Mopa",
-            "Highways": "NH-66, NH-4A, NH-17A"
-        }
-    },
-    "Andhra Pradesh": {
-        "Tagline": "The Emerging Spiritual & Coastal Hub",
-        "Metrics": [
-            {"label": "Domestic Arrivals (2023)", "value": "254.7 Million", "delta": "+32.2% vs 2022"},
-            {"label": "Foreign Arrivals (2023)", "value": "60,426", "delta": "-63.6% vs 2022"},
-            {"label": "APTDCL Operating Income (FY24)", "value": "₹161.45 Crore", "delta": "Data Not Available"},
-        ],
-        "Other_Metrics": [
-            "**Hospitality Metrics (ADR/Occupancy):** Data Not Available",
-            "**Religious Tourism Share:** 78% of the state's sector",
-            "**Policy Target (Avg. Stay):** Increase from 1-2 days to 5 days",
-            "**Policy Target (Avg. Spend):** Increase domestic spend from ₹1,700 to ₹25,000"
-        ],
-        "Archetype": {
-            "Name": "Cultural/Spiritual",
-            "Motivations": "Pilgrimage (dominant), with state efforts to diversify into Nature/Adventure and Wellness.",
-            "Keywords": "**Positive (Tours):** `well managed`, `flexible`. **Negative (Hotels):** `non-functional hotel amenities`, `poor food quality`"
-        },
-        "Micro_Destinations": {
-            "Tirupati": "Spiritual",
-            "Visakhapatnam (Vizag)": "Nature/Leisure",
-            "Araku Valley": "Nature/Escape (hampered by service gaps)",
-            "Gandikota": "Nature/Adventure"
-        },
-        "Infrastructure": {
-            "Airports": "2 International (Visakhapatnam - VTZ, Tirupati - TIR), 2 Major Domestic (Vijayawada - VGA, Rajahmundry - RJA)",
-            "Highways": "NH-16 (Golden Quadrilateral), NH-44 (North-South)"
-        }
-    },
-    "Telangana": {
-        "Tagline": "The Heritage & Business Hub",
-        "Metrics": [
-            {"label": "Domestic Arrivals (2022)", "value": "60.7 Million", "delta": "Data from 2022"},
-            {"label": "Foreign Arrivals (2023)", "value": "160,912", "delta": "+135% vs 2022"},
-            {"label": "Hyderabad RevPAR Growth (Q2 2024)", "value": "+11.9% YoY", "delta": "Led major Indian markets"},
-        ],
-        "Other_Metrics": [
-            "**Hyderabad Occupancy (FY 2023-24):** Among the highest in India",
-            "**Policy Target (Investment):** Attract ₹15,000 crore",
-            "**Policy Target (GDP):** Increase tourism's GDP contribution to 10%",
-            "**Avg. Meal Cost (Hyderabad):** ₹150 - ₹300 (Inexpensive Restaurant)"
-        ],
-        "Archetype": {
-            "Name": "Business/MICE, Cultural/Heritage, Celebration",
-            "Motivations": "Business, Discovery, Celebration. Policy targets Wellness and Destination Weddings.",
-            "Keywords": "**Weddings (Positive):** `beautiful blend of nature and luxury`, `fairytale`, `breathtaking`. **Tours (Mixed):** `supportive staff`, `scheduling issues`"
-        },
-        "Micro_Destinations": {
-            "Hyderabad": "Cultural/Heritage & Business/MICE",
-            "Warangal": "Cultural/Heritage",
-            "Ananthagiri Hills": "Nature/Adventure"
-        },
-        "Infrastructure": {
-            "Airports": "1 International Airport: Rajiv Gandhi International Airport (HYD)",
-            "Highways": "NH-44 (North-South), NH-65 (Pune-Vijayawada)"
-        }
+# The report lives in report_data.json: data extracted *verbatim* from the
+# document. All citations refer to the source document provided.
+REPORT_DATA_PATH = get_setting("REPORT_DATA_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_data.json"))
+REPORT_SCHEMA_VERSION = 1
+
+STATE_KEYS = {"Tagline": str, "Metrics": list, "Other_Metrics": list, "Archetype": dict,
+              "Micro_Destinations": dict, "Infrastructure": dict}
+OVERVIEW_KEYS = {"Intro": str, "Market_Growth": list, "Traveler_Values": list, "Comparative_Arrivals": dict,
+                 "Hospitality_KPIs": dict, "Archetype_Matrix": dict, "Sentiment_Radar": dict}
+# Text fields the renderers and load_report_table() read from each item
+STATE_FIELDS = {"Metrics": ("label", "value", "delta"), "Archetype": ("Name", "Motivations", "Keywords"),
+                "Infrastructure": ("Airports", "Highways")}
+KPI_HEADERS = ("State", "Key City", "Occupancy (%)", "ADR (₹)", "Key Revenue / Metric")
+
+class ReportValidationError(ValueError):
+    """Raised when the report data file does not match the expected structure."""
+
+def validate_report(report):
+    """Checks the structure the dashboard relies on. Raises ReportValidationError listing every problem."""
+    problems = []
+
+    def expect(value, kind, where):
+        if not isinstance(value, kind):
+            problems.append(f"{where}: expected {kind.__name__}, got {type(value).__name__}")
+            return False
+        return True
+
+    def expect_text(item, fields, where):
+        if expect(item, dict, where):
+            for field in fields:
+                expect(item.get(field), str, f"{where}.{field}")
+
+    def section(container, key, kind):
+        # The value when it has the right type (already reported otherwise), else an empty one
+        value = container.get(key)
+        return value if isinstance(value, kind) else kind()
+
+    if not expect(report, dict, "report") or not expect(report.get("Overview"), dict, "Overview"):
+        raise ReportValidationError("; ".join(problems))
+
+    overview = report["Overview"]
+    for key, kind in OVERVIEW_KEYS.items():
+        expect(overview.get(key), kind, f"Overview.{key}")
+    for name in ("Market_Growth", "Traveler_Values"):
+        for i, item in enumerate(section(overview, name, list)):
+            expect_text(item, ("Metric", "Value"), f"Overview.{name}[{i}]")
+            if isinstance(item, dict) and "Source" not in item:
+                problems.append(f"Overview.{name}[{i}]: needs a Source")
+    arrivals = section(overview, "Comparative_Arrivals", dict)
+    states = arrivals.get("States")
+    if expect(states, list, "Overview.Comparative_Arrivals.States"):
+        for key in ("Domestic", "Domestic_Source", "Domestic_Year", "Foreign", "Foreign_Source", "Foreign_Year"):
+            if not isinstance(arrivals.get(key), list) or len(arrivals[key]) != len(states):
+                problems.append(f"Overview.Comparative_Arrivals.{key}: must have one entry per state")
+        for key, kind in (("States", str), ("Domestic_Year", str), ("Foreign_Year", str), ("Domestic", (int, float)), ("Foreign", (int, float))):
+            if not all(isinstance(v, kind) for v in section(arrivals, key, list)):
+                problems.append(f"Overview.Comparative_Arrivals.{key}: values must be {'text' if kind is str else 'numbers'}")
+    for name in ("Hospitality_KPIs", "Archetype_Matrix"):
+        table = section(overview, name, dict)
+        headers = table.get("headers")
+        if not expect(headers, list, f"Overview.{name}.headers") or not expect(table.get("rows"), list, f"Overview.{name}.rows"):
+            continue
+        if name == "Hospitality_KPIs" and not set(KPI_HEADERS) <= set(headers):
+            problems.append(f"Overview.{name}.headers: needs {', '.join(KPI_HEADERS)}")
+        for i, row in enumerate(table["rows"]):
+            if not isinstance(row, list) or len(row) != len(headers):
+                problems.append(f"Overview.{name}.rows[{i}]: expected a list of {len(headers)} cells")
+            elif not all(isinstance(cell, str) for cell in row):
+                problems.append(f"Overview.{name}.rows[{i}]: cells must be text")
+    if "source" not in section(overview, "Archetype_Matrix", dict):
+        problems.append("Overview.Archetype_Matrix: needs a source")
+    radar = section(overview, "Sentiment_Radar", dict)
+    categories = radar.get("Categories")
+    if expect(categories, list, "Overview.Sentiment_Radar.Categories") and expect(radar.get("States"), dict, "Overview.Sentiment_Radar.States"):
+        for state, scores in radar["States"].items():
+            if not isinstance(scores, list) or len(scores) != len(categories) or not all(isinstance(v, (int, float)) for v in scores):
+                problems.append(f"Overview.Sentiment_Radar.States.{state}: expected one numeric score per category")
+
+    for state, state_data in report.items():
+        if state == "Overview" or not expect(state_data, dict, state):
+            continue
+        for key, kind in STATE_KEYS.items():
+            expect(state_data.get(key), kind, f"{state}.{key}")
+        for i, metric in enumerate(section(state_data, "Metrics", list)):
+            expect_text(metric, STATE_FIELDS["Metrics"], f"{state}.Metrics[{i}]")
+        for key in ("Archetype", "Infrastructure"):
+            if isinstance(state_data.get(key), dict):
+                expect_text(state_data[key], STATE_FIELDS[key], f"{state}.{key}")
+        for i, item in enumerate(section(state_data, "Other_Metrics", list)):
+            if not isinstance(item, str) or ":** " not in item:
+                problems.append(f"{state}.Other_Metrics[{i}]: expected a \"**Label:** value\" string")
+
+    if problems:
+        raise ReportValidationError("; ".join(problems))
+
+class ReportStore:
+    """
+    Holds the report loaded from REPORT_DATA_PATH, shared read-only by every
+    session in the process. current() costs one os.stat per rerun; the file
+    is re-read only when its mtime or size changes, and swapped in only when
+    its checksum differs and it passes validation. A broken edit, or a
+    missing or unreadable file, keeps the previous version live.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self.data = None
+        self.version = None  # sha256 of the file contents
+        self.error = None  # why the latest file on disk was rejected, if it was
+
+    def current(self):
+        """Returns (data, version), reloading first if the file changed on disk."""
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            # Missing or unreadable (e.g. mid-replace): checked again on the next rerun
+            with self._lock:
+                self._reject(None, e)
+            return self.data, self.version
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self._reload(signature)
+        return self.data, self.version
+
+    def _reload(self, signature):
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            checksum = hashlib.sha256(raw).hexdigest()
+            if checksum == self.version:
+                self._signature, self.error = signature, None
+                return
+            document = json.loads(raw)
+            if not isinstance(document, dict):
+                raise ReportValidationError(f"expected a JSON object, got {type(document).__name__}")
+            if document.get("schema_version") != REPORT_SCHEMA_VERSION:
+                raise ReportValidationError(f"unsupported schema_version {document.get('schema_version')!r}")
+            validate_report(document.get("report"))
+        except (OSError, ValueError, TypeError, AttributeError, KeyError) as e:
+            # ValueError covers JSONDecodeError and ReportValidationError; the others
+            # are a validate_report() gap, which must not take the dashboard down either
+            self._reject(signature, e)
+            return
+        self.data, self.version, self.error = document["report"], checksum, None
+        self._signature = signature
+
+    def _reject(self, signature, error):
+        """Keeps the current version live, or raises when there is none yet."""
+        if self.data is None:
+            raise error
+        message = f"{self.path}: {error}"
+        if message != self.error:
+            logging.getLogger(__name__).error("Keeping report version %s; rejected update: %s", self.version[:12], message)
+        self.error = message
+        # A rejected file is not re-read until it changes again
+        self._signature = signature
+
+@st.cache_resource(show_spinner=False)
+def get_report_store(path):
+    return ReportStore(path)
+
+_report_store = get_report_store(REPORT_DATA_PATH)
+# DATA must be treated as read-only: it is the same object in every session.
+# DATA_VERSION identifies this version of the report; derived artifacts
+# (figures, prompts, indexes, tables, cached contexts, answers) are keyed on
+# it and therefore rebuilt when the file changes.
+DATA, DATA_VERSION = _report_store.current()
+
+STATE_NAMES = [name for name in DATA if name != "Overview"]
+
+def data_hash(data):
+    """Returns a stable content hash for a JSON-serializable DATA slice."""
+    encoded = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Typed Report Table (display strings parsed once into numeric columns)
+# ----------------------------------------------------------------------
+
+QUANTITY_PATTERN = re.compile(
+    r"^(?P<bound>[>~]\s*)?(?P<sign>[+-])?(?P<cur>₹)?(?P<low>\d[\d,]*(?:\.\d+)?)(?P<unit_low>%)?"
+    r"(?:(?P<sep>\s*-\s*|\s+to\s+)(?P<sign2>[+-])?(?P<cur2>₹)?(?P<high>\d[\d,]*(?:\.\d+)?))?"
+    r"(?P<unit>%|\s*(?i:Million|Lakhs?|Crore|Cr)\b)?(?P<rest>.*)$"
+)
+UNIT_NAMES = {"%": "percent", "million": "million", "lakh": "lakh", "lakhs": "lakh", "crore": "crore", "cr": "crore"}
+# Multipliers to a common base unit, so "1.17 Million" ranks above "401,000"
+UNIT_SCALES = {"million": 1e6, "lakh": 1e5, "crore": 1e7}
+PERIOD_PATTERN = re.compile(r"\s*\(([^()]*(?:\d{4}|FY\s?\d{2})[^()]*)\)")
+
+REPORT_TABLE_COLUMNS = ("state", "section", "kind", "label", "metric", "period", "low", "high", "bound",
+                        "unit", "currency", "source", "decimals", "template")
+NUMERIC_COLUMNS = {"low": float, "high": float, "source": int, "decimals": int}
+
+def _decimals(number_text):
+    return len(number_text.split(".")[1]) if "." in number_text else 0
+
+def parse_quantity(text):
+    """
+    Parses a display string such as "62-64%", "₹6,900 - ₹7,100", "> ₹8,500",
+    "22.2 Million" or "+1.72% YoY". Returns a dict with numeric `low`/`high`
+    (NaN when the string is not a quantity), `bound` (">" for lower bounds),
+    `unit`, `currency`, `decimals` and a `template` that reproduces the
+    original string from the numbers.
+    """
+    match = QUANTITY_PATTERN.match(text)
+    if not match:
+        return {"low": math.nan, "high": math.nan, "bound": "", "unit": "", "currency": "", "decimals": 0,
+                "template": text.replace("{", "{{").replace("}", "}}")}
+
+    def number(group, sign_group):
+        value = float(match.group(group).replace(",", ""))
+        return -value if match.group(sign_group) == "-" else value
+
+    # Replace each number (and a leading minus) with a placeholder; "+" stays literal
+    pieces, cursor = [], 0
+    for group, sign_group in (("low", "sign"), ("high", "sign2")):
+        if match.group(group) is None:
+            continue
+        start = match.start(sign_group) if match.group(sign_group) == "-" else match.start(group)
+        pieces.append(text[cursor:start].replace("{", "{{").replace("}", "}}") + "{" + group + "}")
+        cursor = match.end(group)
+    template = "".join(pieces) + text[cursor:].replace("{", "{{").replace("}", "}}")
+
+    low = number("low", "sign")
+    high = number("high", "sign2") if match.group("high") else math.nan
+    bound = match.group("bound").strip() if match.group("bound") else ""
+    unit = (match.group("unit") or match.group("unit_low") or "").strip().lower()
+    return {
+        "low": low,
+        "high": low if math.isnan(high) and not bound else high,
+        "bound": bound,
+        "unit": UNIT_NAMES.get(unit, unit),
+        "currency": "INR" if match.group("cur") else "",
+        "decimals": max(_decimals(match.group("low")), _decimals(match.group("high") or "")),
+        "template": template,
     }
+
+def split_period(label):
+    """Splits "Domestic Arrivals (2024)" into ("Domestic Arrivals", "2024")."""
+    match = PERIOD_PATTERN.search(label)
+    if not match:
+        return label, ""
+    return (label[:match.start()] + label[match.end():]).strip(), match.group(1)
+
+class ReportTable:
+    """
+    Column-oriented table of every quantity in the report, one row per value.
+    Numeric columns (`low`, `high`, `source`, `decimals`) are numpy arrays and
+    text columns are numpy string arrays, so filters and rankings are
+    vectorized: e.g. table.select(section="Hospitality_KPIs", metric="Occupancy").ranked().
+    Display strings are rendered from the numbers with display().
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, rows):
+        import numpy as np
+
+        columns = {}
+        for name in REPORT_TABLE_COLUMNS:
+            values = [row.get(name, "") for row in rows]
+            if name in NUMERIC_COLUMNS:
+                columns[name] = np.array([-1 if v == "" else v for v in values], dtype=NUMERIC_COLUMNS[name])
+            else:
+                columns[name] = np.array(values, dtype=str)
+        return cls(columns)
+
+    def __len__(self):
+        return len(self.columns["label"])
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def mid(self):
+        """Midpoint of each range; lower bounds and single values use `low`."""
+        import numpy as np
+
+        return np.where(np.isnan(self.high), self.low, (self.low + self.high) / 2)
+
+    @property
+    def base_mid(self):
+        """`mid` in base units: Million, Lakh and Crore values multiplied out."""
+        import numpy as np
+
+        scale = np.ones(len(self))
+        for unit, factor in UNIT_SCALES.items():
+            scale[self.unit == unit] = factor
+        return self.mid * scale
+
+    def where(self, mask):
+        return ReportTable({name: column[mask] for name, column in self.columns.items()})
+
+    def select(self, **equals):
+        """Returns the rows whose columns equal the given values."""
+        import numpy as np
+
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in equals.items():
+            mask &= self.columns[name] == value
+        return self.where(mask)
+
+    def ranked(self, descending=True):
+        """Returns the numeric rows ordered by midpoint, in base units."""
+        import numpy as np
+
+        numeric = self.where(~np.isnan(self.low))
+        order = np.argsort(-numeric.base_mid if descending else numeric.base_mid, kind="stable")
+        return numeric.where(order)
+
+    def display(self, i):
+        """Renders row i back into its display string."""
+        decimals = self.decimals[i]
+        return str(self.template[i]).format(low=f"{self.low[i]:,.{decimals}f}", high=f"{self.high[i]:,.{decimals}f}")
+
+    def row(self, i):
+        row = {name: column[i].item() for name, column in self.columns.items()}
+        row["display"] = self.display(i)
+        return row
+
+def load_report_table(data):
+    """Parses every quantity in DATA into a ReportTable."""
+    rows = []
+
+    def add(state, section, label, text, kind="value", source=-1, period=None):
+        metric, label_period = split_period(label)
+        rows.append(dict(parse_quantity(text), state=state, section=section, kind=kind, label=label,
+                         metric=metric, period=period if period is not None else label_period, source=source))
+
+    overview = data['Overview']
+    for section in ("Market_Growth", "Traveler_Values"):
+        for item in overview[section]:
+            add("South India", section, item['Metric'], item['Value'], source=item['Source'])
+
+    arrivals = overview['Comparative_Arrivals']
+    for kind in ("Domestic", "Foreign"):
+        for state, value, year, source in zip(arrivals['States'], arrivals[kind], arrivals[f"{kind}_Year"], arrivals[f"{kind}_Source"]):
+            add(state, "Comparative_Arrivals", f"{kind} Arrivals", f"{value} million", source=source, period=year.strip("()"))
+
+    kpis = overview['Hospitality_KPIs']
+    for values in kpis['rows']:
+        row = dict(zip(kpis['headers'], values))
+        city, city_period = split_period(row["Key City"])
+        for metric, header in (("Occupancy", "Occupancy (%)"), ("ADR", "ADR (₹)"), ("Key Revenue / Metric", "Key Revenue / Metric")):
+            # A period inside the cell, e.g. "₹6,900 - ₹7,100 (Aug 2024)", overrides the key
+            # city's; an annotated cell such as "16.43% (Tourism GSDP Contribution)" does not inherit it
+            value, period = split_period(row[header])
+            if not period and "(" not in value:
+                period = city_period
+            add(row["State"], "Hospitality_KPIs", f"{city} {metric}", value, period=period)
+            rows[-1]["metric"] = metric
+
+    for state in (name for name in data if name != "Overview"):
+        for item in data[state]['Metrics']:
+            add(state, "Metrics", item['label'], item['value'])
+            add(state, "Metrics", item['label'], item['delta'], kind="delta")
+        for item in data[state]['Other_Metrics']:
+            label, _, value = item.partition(":** ")
+            add(state, "Other_Metrics", label.strip("*"), value)
+
+    return ReportTable.from_rows(rows)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_report_table(version, _data):
+    """Parses the report once per data version, shared by every session."""
+    return load_report_table(_data)
+
+
+# ----------------------------------------------------------------------
+# Time-Series Store (multi-year arrivals, occupancy and ADR)
+# ----------------------------------------------------------------------
+
+# Monthly, district-level history is kept in TIMESERIES_PATH as Parquet,
+# written by build_timeseries.py:
+#   raw/year=YYYY/*.parquet    one row per district and month
+#   rollups/<name>.parquet     pre-aggregated rollups, one file per entry below
+#   manifest.json              row count, year range and sources of the build
+# The dashboard reads only the rollups, whose size depends on the number of
+# states/regions and months covered, not on the number of raw rows. Means
+# (occupancy, ADR) are stored as sum and count so rollups can be re-aggregated.
+TIMESERIES_PATH = get_setting("TIMESERIES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "timeseries"))
+TIMESERIES_SCHEMA_VERSION = 1
+TIMESERIES_ROLLUPS = {
+    "state_year": ("state", "year"),
+    "state_month": ("state", "year", "month"),
+    "region_year": ("region", "year"),
 }
+TIMESERIES_METRICS = {
+    "arrivals": "Total Arrivals (Millions)",
+    "occupancy_pct": "Occupancy (%)",
+    "adr_inr": "ADR (₹)",
+}
+
+class TimeSeriesStore:
+    """Read-only view of the rollups in a time-series store directory."""
+
+    def __init__(self, path):
+        import pyarrow.parquet as pq
+
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("schema_version") != TIMESERIES_SCHEMA_VERSION:
+            raise ValueError(f"{path}: unsupported time-series schema_version {self.manifest.get('schema_version')!r}")
+        self.rollups = {
+            name: pq.read_table(os.path.join(path, "rollups", f"{name}.parquet"))
+            for name in TIMESERIES_ROLLUPS
+        }
+
+    @property
+    def years(self):
+        return list(range(self.manifest["first_year"], self.manifest["last_year"] + 1))
+
+    def query(self, rollup, start=None, end=None, **equals):
+        """Returns the rollup's rows with start <= year <= end (and columns equal to `equals`) as a dict of lists."""
+        import pyarrow.compute as pc
+
+        table = self.rollups[rollup]
+        conditions = []
+        if start is not None:
+            conditions.append(pc.greater_equal(table["year"], start))
+        if end is not None:
+            conditions.append(pc.less_equal(table["year"], end))
+        conditions.extend(pc.equal(table[name], value) for name, value in equals.items())
+        if conditions:
+            mask = conditions[0]
+            for condition in conditions[1:]:
+                mask = pc.and_(mask, condition)
+            table = table.filter(mask)
+        return table.to_pydict()
+
+    def comparative_arrivals(self, start, end):
+        """State arrival totals for start..end, in the shape of the report's Comparative_Arrivals."""
+        rows = self.query("state_year", start, end)
+        totals = {}
+        for state, domestic, foreign in zip(rows["state"], rows["domestic_arrivals"], rows["foreign_arrivals"]):
+            total = totals.setdefault(state, [0, 0])
+            total[0] += domestic
+            total[1] += foreign
+        states = [state for state in STATE_NAMES if state in totals] + sorted(set(totals) - set(STATE_NAMES))
+        period = str(start) if start == end else f"{start}-{end}"
+        source = ", ".join(self.manifest.get("sources", [])) or "time-series store"
+        return {
+            "States": states,
+            "Domestic": [round(totals[state][0] / 1e6, 2) for state in states],
+            "Domestic_Source": [source] * len(states),
+            "Domestic_Year": [f"({period})"] * len(states),
+            "Foreign": [round(totals[state][1] / 1e6, 3) for state in states],
+            "Foreign_Source": [source] * len(states),
+            "Foreign_Year": [f"({period})"] * len(states),
+            "Period": period,
+        }
+
+    def trend(self, rollup, metric, start, end):
+        """One series per state or region of `metric` over time, from the given rollup."""
+        rows = self.query(rollup, start, end)
+        group_column = TIMESERIES_ROLLUPS[rollup][0]
+        series = {}
+        for i, group in enumerate(rows[group_column]):
+            if metric == "arrivals":
+                value = (rows["domestic_arrivals"][i] + rows["foreign_arrivals"][i]) / 1e6
+            else:
+                count = rows[f"{metric}_count"][i]
+                value = rows[f"{metric}_sum"][i] / count if count else None
+            x = f"{rows['year'][i]}-{rows['month'][i]:02d}" if "month" in rows else str(rows['year'][i])
+            points = series.setdefault(group, {"x": [], "y": []})
+            points["x"].append(x)
+            points["y"].append(value)
+        return {"Series": series, "Metric": TIMESERIES_METRICS[metric], "Dimension": group_column.title()}
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_timeseries_store(path, signature):
+    return TimeSeriesStore(path)
+
+def get_timeseries_store():
+    """Returns the store in TIMESERIES_PATH, reloaded when it is rebuilt, or None if there is none."""
+    try:
+        stat = os.stat(os.path.join(TIMESERIES_PATH, "manifest.json"))
+    except FileNotFoundError:
+        return None
+    return _load_timeseries_store(TIMESERIES_PATH, (stat.st_mtime_ns, stat.st_size))
 
 
 # ----------------------------------------------------------------------
 # Plotting Functions (Plotly)
 # ----------------------------------------------------------------------
 
+@traced()
 def plot_comparative_arrivals(data):
     """Generates a grouped bar chart for domestic vs. foreign arrivals."""
-    df = pd.DataFrame(data)
-    
+    import plotly.graph_objects as go
+
     # Create text labels with years
     domestic_text = [f"{val}M {year}" for val, year in zip(data['Domestic'], data['Domestic_Year'])]
     foreign_text = [f"{val}M {year}" for val, year in zip(data['Foreign'], data['Foreign_Year'])]
@@ -272,8 +761,8 @@ def plot_comparative_arrivals(data):
     
     fig.add_trace(go.Bar(
         name='Domestic Arrivals (Millions)',
-        x=df['States'],
-        y=df['Domestic'],
+        x=data['States'],
+        y=data['Domestic'],
         text=domestic_text,
         textposition='auto',
         marker_color='#1f77b4',
@@ -283,8 +772,8 @@ def plot_comparative_arrivals(data):
     
     fig.add_trace(go.Bar(
         name='Foreign Arrivals (Millions)',
-        x=df['States'],
-        y=df['Foreign'],
+        x=data['States'],
+        y=data['Foreign'],
         text=foreign_text,
         textposition='auto',
         marker_color='#ff7f0e',
@@ -292,9 +781,13 @@ def plot_comparative_arrivals(data):
         customdata=data['Foreign_Source']
     ))
     
+    if 'Period' in data:
+        title_text = f"South India Tourist Arrivals (Millions), {data['Period']}"
+    else:
+        title_text = 'South India Tourist Arrivals (Millions) [Note: Data from 2022-2024]'
     fig.update_layout(
         barmode='group',
-        title_text='South India Tourist Arrivals (Millions) [Note: Data from 2022-2024]',
+        title_text=title_text,
         xaxis_title='State',
         yaxis_title='Tourist Arrivals (Millions)',
         legend_title_text='Visitor Type',
@@ -306,8 +799,11 @@ def plot_comparative_arrivals(data):
     
     return fig
 
+@traced()
 def plot_sentiment_radar(data):
     """Generates a radar chart for dominant traveler motivations."""
+    import plotly.graph_objects as go
+
     fig = go.Figure()
     
     categories = data['Categories']
@@ -335,49 +831,276 @@ def plot_sentiment_radar(data):
     )
     return fig
 
+@traced()
+def plot_arrivals_trend(data):
+    """Generates a line chart of one time-series metric, one line per state or region."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    for name, points in data['Series'].items():
+        fig.add_trace(go.Scatter(
+            x=points['x'],
+            y=points['y'],
+            mode='lines+markers' if len(points['x']) <= 24 else 'lines',
+            name=name,
+            hovertemplate=f"<b>{name}</b><br>%{{x}}: %{{y:,.2f}}<extra></extra>"
+        ))
+    fig.update_layout(
+        title_text=f"{data['Metric']} by {data['Dimension']}",
+        xaxis_title='Period',
+        yaxis_title=data['Metric'],
+        legend_title_text=data['Dimension'],
+        margin=dict(l=20, r=20, t=40, b=20),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+    )
+    fig.update_xaxes(type='category')
+    fig.update_yaxes(gridcolor='#f0f0f0')
+    return fig
+
+# ----------------------------------------------------------------------
+# Figure Cache
+# ----------------------------------------------------------------------
+
+# Figures are fully determined by the DATA slice they are built from, so they
+# are built once per data version and shared by every session on the server.
+FIGURE_BUILDERS = {
+    "comparative_arrivals": plot_comparative_arrivals,
+    "sentiment_radar": plot_sentiment_radar,
+    "arrivals_trend": plot_arrivals_trend,
+}
+
+# Payload budget: st.plotly_chart sends the whole figure JSON to the browser
+# on every render. Line traces longer than FIGURE_POINT_BUDGET are
+# downsampled ("lttb" keeps the visual shape, "minmax" keeps every peak and
+# trough), and figures with more than FIGURE_WEBGL_THRESHOLD points switch
+# to WebGL trace types, which stay responsive where SVG does not.
+FIGURE_POINT_BUDGET = int(get_setting("FIGURE_POINT_BUDGET", 2000))
+FIGURE_WEBGL_THRESHOLD = int(get_setting("FIGURE_WEBGL_THRESHOLD", 5000))
+FIGURE_DOWNSAMPLING = get_setting("FIGURE_DOWNSAMPLING", "lttb")
+
+WEBGL_TRACE_TYPES = {"scatter": "scattergl", "scatterpolar": "scatterpolargl"}
+# Trace attributes with one entry per point, kept in step when downsampling
+PER_POINT_ATTRIBUTES = ("x", "y", "text", "hovertext", "customdata", "ids")
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that preserve the shape of (x, y)."""
+    import numpy as np
+
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # threshold - 2 buckets between the always-kept first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    indices = np.empty(threshold, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        areas = np.abs((x[selected] - next_x) * (y[start:end] - y[selected])
+                       - (x[selected] - x[start:end]) * (next_y - y[selected]))
+        selected = start + int(np.argmax(areas))
+        indices[i + 1] = selected
+    return indices
+
+def minmax_indices(y, threshold):
+    """Indices of the minimum and maximum of each of threshold/2 equal buckets, plus the end points."""
+    import numpy as np
+
+    n = len(y)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+    edges = np.linspace(0, n, (threshold - 2) // 2 + 1).astype(int)
+    keep = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        keep += [start + int(np.argmin(y[start:end])), start + int(np.argmax(y[start:end]))]
+    return np.unique(keep)
+
+def downsample_indices(x, y, threshold):
+    """Indices of the points to keep of a (x, y) series; missing y values are dropped."""
+    import numpy as np
+
+    values = np.array([np.nan if v is None else v for v in y], dtype=float)
+    valid = np.flatnonzero(~np.isnan(values))
+    if x is not None and np.issubdtype(np.asarray(x).dtype, np.number):
+        positions = np.asarray(x, dtype=float)[valid]
+    else:
+        # Dates and categories are evenly spaced for the purpose of the algorithm
+        positions = valid.astype(float)
+    if FIGURE_DOWNSAMPLING == "minmax":
+        return valid[minmax_indices(values[valid], threshold)]
+    return valid[lttb_indices(positions, values[valid], threshold)]
+
+def point_count(trace_spec):
+    for attribute in ("y", "r", "x"):
+        if trace_spec.get(attribute) is not None:
+            return len(trace_spec[attribute])
+    return 0
+
+def apply_payload_budget(fig):
+    """Downsamples long line traces and switches large figures to WebGL. Returns the (new) figure."""
+    import plotly.graph_objects as go
+
+    specs = [trace.to_plotly_json() for trace in fig.data]
+    changed = False
+    for spec in specs:
+        n = point_count(spec)
+        if spec.get("type") in WEBGL_TRACE_TYPES and spec.get("y") is not None and n > FIGURE_POINT_BUDGET:
+            keep = downsample_indices(spec.get("x"), spec["y"], FIGURE_POINT_BUDGET)
+            for attribute in PER_POINT_ATTRIBUTES:
+                values = spec.get(attribute)
+                if values is not None and not isinstance(values, str) and len(values) == n:
+                    spec[attribute] = [values[i] for i in keep]
+            changed = True
+    if sum(point_count(spec) for spec in specs) > FIGURE_WEBGL_THRESHOLD:
+        for spec in specs:
+            if spec.get("type") in WEBGL_TRACE_TYPES:
+                spec["type"] = WEBGL_TRACE_TYPES[spec["type"]]
+                changed = True
+    return go.Figure(data=specs, layout=fig.layout) if changed else fig
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _build_figure(builder_name, digest, _data):
+    """
+    Builds a figure within the payload budget. Cached on (builder_name,
+    digest) and shared by every session, so callers must not modify it.
+    Returns (figure, serialized size in bytes).
+    """
+    fig = apply_payload_budget(FIGURE_BUILDERS[builder_name](_data))
+    return fig, len(fig.to_json().encode("utf-8"))
+
+@traced()
+def get_figure(builder_name, data):
+    """Returns the (read-only) figure for `data`, building it only when the data version changes."""
+    fig, payload_bytes = _build_figure(builder_name, data_hash(data), data)
+    if TRACING:
+        get_metrics_registry().observe("figure_payload_bytes", payload_bytes, BYTES_BUCKETS, figure=builder_name)
+    return fig
+
 # ----------------------------------------------------------------------
 # Tab Creation Functions
 # ----------------------------------------------------------------------
 
+# RENDER_MODE="batched" composes each section into a single element (one
+# markdown block per section, one HTML grid for a row of metrics or info
+# boxes), so a rerun sends a few delta messages instead of one per line.
+# "elements" emits one Streamlit element per item.
+RENDER_MODE = get_setting("RENDER_MODE", "batched")
+
+DELTA_COLORS = {"up": "rgb(9, 171, 59)", "down": "rgb(255, 43, 43)", "": "rgba(128, 128, 128, 0.9)"}
+
+def inline_markdown_html(text):
+    """Converts the inline markdown used in the report (**bold**, *italic*, `code`) to escaped HTML."""
+    text = html.escape(text, quote=False)
+    text = re.sub(r"`([^`]+)`", r"<code>\1</code>", text)
+    text = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", text)
+    return re.sub(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])", r"<em>\1</em>", text)
+
+def metric_card_html(label, value, delta=None, help_text=None):
+    """An st.metric-style card: label, large value and a colored delta."""
+    title = f' title="{html.escape(help_text)}"' if help_text else ""
+    parts = [f'<div style="flex: 1 1 0; min-width: 9rem"{title}>',
+             f'<div style="font-size: 0.875rem">{html.escape(label)}</div>',
+             f'<div style="font-size: 2.25rem; line-height: 1.4">{html.escape(value)}</div>']
+    if delta:
+        direction = "down" if delta.startswith("-") else "up" if delta.startswith("+") else ""
+        arrow = {"up": "↑ ", "down": "↓ "}.get(direction, "")
+        parts.append(f'<div style="font-size: 0.875rem; color: {DELTA_COLORS[direction]}">{arrow}{html.escape(delta)}</div>')
+    parts.append("</div>")
+    return "".join(parts)
+
+def info_card_html(text):
+    """An st.info-style box holding inline markdown."""
+    return ('<div style="flex: 1 1 0; min-width: 9rem; padding: 1rem; border-radius: 0.5rem; '
+            f'background: rgba(28, 131, 225, 0.1)">{inline_markdown_html(text)}</div>')
+
+def card_grid_html(cards):
+    """Lays out cards side by side, wrapping on narrow screens."""
+    return f'<div style="display: flex; flex-wrap: wrap; gap: 1rem; margin-bottom: 1rem">{"".join(cards)}</div>'
+
+def table_columns(table):
+    """Converts a report table ({"headers": [...], "rows": [[...], ...]}) to columns for st.dataframe."""
+    return {header: [row[i] for row in table['rows']] for i, header in enumerate(table['headers'])}
+
+@st.cache_resource(show_spinner=False)
+def load_chart_modules():
+    """
+    Imports what st.plotly_chart and st.dataframe load on first use, once per
+    process. Sessions opening the overview together wait on the cache's lock
+    instead of importing numpy and pandas concurrently from several script
+    threads, which can hand a thread a partially initialized module.
+    """
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    import pyarrow  # noqa: F401
+
+REPORT_SOURCE = "!S - 2 - South India Travel Intelligence Report (Internal Research Only)"
+ROE_TEXT = (
+    "Travel has evolved from a discretionary expense into a primary vehicle for self-expression. "
+    "The ability to command premium pricing is now directly correlated to the 'Return on Experience' (ROE) "
+    "— a property's ability to deliver a unique, non-commodifiable, and emotionally resonant journey."
+)
+
+@traced()
 def create_overview_tab(data):
     """Populates the South India Overview tab."""
-    
-    st.title("South India Travel Intelligence Dashboard")
-    st.markdown(f"**Source:** *!S - 2 - South India Travel Intelligence Report (Internal Research Only)*")
-    st.markdown("---")
-    
-    # --- Executive Overview ---
-    st.subheader("Executive Overview: The Structural Schism")
-    st.markdown(data['Overview']['Intro'])
-    
-    cols = st.columns(len(data['Overview']['Market_Growth']))
-    for i, item in enumerate(data['Overview']['Market_Growth']):
-        cols[i].metric(label=item['Metric'], value=item['Value'], help=f"Source: [cite: {item['Source']}]")
-        
-    st.markdown("**The New Value Equation: Return on Experience (ROE)**")
-    st.markdown(
-        "Travel has evolved from a discretionary expense into a primary vehicle for self-expression. "
-        "The ability to command premium pricing is now directly correlated to the 'Return on Experience' (ROE) "
-        "— a property's ability to deliver a unique, non-commodifiable, and emotionally resonant journey."
-    )
-    
-    value_cols = st.columns(len(data['Overview']['Traveler_Values']))
-    for i, item in enumerate(data['Overview']['Traveler_Values']):
-        value_cols[i].info(f"**{item['Value']}** {item['Metric']} [cite: {item['Source']}]")
+    load_chart_modules()
 
-    st.markdown("---")
+    if RENDER_MODE == "batched":
+        st.markdown(f"""# South India Travel Intelligence Dashboard
+
+**Source:** *{REPORT_SOURCE}*
+
+---
+
+### Executive Overview: The Structural Schism
+
+{data['Overview']['Intro']}""")
+        st.markdown(card_grid_html(
+            metric_card_html(item['Metric'], item['Value'], help_text=f"Source: [cite: {item['Source']}]")
+            for item in data['Overview']['Market_Growth']), unsafe_allow_html=True)
+        st.markdown(f"**The New Value Equation: Return on Experience (ROE)**\n\n{ROE_TEXT}")
+        st.markdown(card_grid_html(
+            info_card_html(f"**{item['Value']}** {item['Metric']} [cite: {item['Source']}]")
+            for item in data['Overview']['Traveler_Values']) + "\n\n---", unsafe_allow_html=True)
+    else:
+        st.title("South India Travel Intelligence Dashboard")
+        st.markdown(f"**Source:** *{REPORT_SOURCE}*")
+        st.markdown("---")
+
+        # --- Executive Overview ---
+        st.subheader("Executive Overview: The Structural Schism")
+        st.markdown(data['Overview']['Intro'])
+
+        cols = st.columns(len(data['Overview']['Market_Growth']))
+        for i, item in enumerate(data['Overview']['Market_Growth']):
+            cols[i].metric(label=item['Metric'], value=item['Value'], help=f"Source: [cite: {item['Source']}]")
+
+        st.markdown("**The New Value Equation: Return on Experience (ROE)**")
+        st.markdown(ROE_TEXT)
+
+        value_cols = st.columns(len(data['Overview']['Traveler_Values']))
+        for i, item in enumerate(data['Overview']['Traveler_Values']):
+            value_cols[i].info(f"**{item['Value']}** {item['Metric']} [cite: {item['Source']}]")
+
+        st.markdown("---")
     
     # --- Comparative Visuals ---
     st.subheader("Quantitative State Comparison")
     
-    # Bar Chart
-    fig_bar = plot_comparative_arrivals(data['Overview']['Comparative_Arrivals'])
-    st.plotly_chart(fig_bar, use_container_width=True)
+    # Bar Chart, over a selectable period when multi-year history is available
+    store = get_timeseries_store()
+    if store is None:
+        fig_bar = get_figure("comparative_arrivals", data['Overview']['Comparative_Arrivals'])
+        st.plotly_chart(fig_bar, use_container_width=True)
+    else:
+        create_arrivals_history(store)
     
     # KPI Table
     st.markdown("**Comparative Hospitality KPIs (2023-2024)**")
-    df_kpi = pd.DataFrame(data['Overview']['Hospitality_KPIs']['rows'], columns=data['Overview']['Hospitality_KPIs']['headers'])
-    st.dataframe(df_kpi, use_container_width=True, hide_index=True)
+    st.dataframe(table_columns(data['Overview']['Hospitality_KPIs']), use_container_width=True, hide_index=True)
 
     st.markdown("---")
     
@@ -389,30 +1112,54 @@ def create_overview_tab(data):
     with col1:
         # Archetype Matrix
         st.markdown(f"**Cross-State Traveller Profile & Motivation Matrix [cite: {data['Overview']['Archetype_Matrix']['source']}]**")
-        df_arch = pd.DataFrame(data['Overview']['Archetype_Matrix']['rows'], columns=data['Overview']['Archetype_Matrix']['headers'])
-        st.dataframe(df_arch, use_container_width=True, hide_index=True, height=250)
+        st.dataframe(table_columns(data['Overview']['Archetype_Matrix']), use_container_width=True, hide_index=True, height=250)
         
     with col2:
         # Radar Chart
-        fig_radar = plot_sentiment_radar(data['Overview']['Sentiment_Radar'])
+        fig_radar = get_figure("sentiment_radar", data['Overview']['Sentiment_Radar'])
         st.plotly_chart(fig_radar, use_container_width=True)
 
 
-def create_state_tab(state_data):
-    """Creates a standardized tab for a single state."""
-    
+def create_arrivals_history(store):
+    """Arrivals bar chart and trend chart over a selected period, queried from the time-series rollups."""
+    years = store.years
+    start, end = (years[0], years[-1]) if len(years) == 1 else st.select_slider(
+        "Period", options=years, value=(years[0], years[-1]), key="arrivals_period")
+    fig_bar = get_figure("comparative_arrivals", store.comparative_arrivals(start, end))
+    st.plotly_chart(fig_bar, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    rollup = col1.radio("Trend", list(TIMESERIES_ROLLUPS), horizontal=True, key="arrivals_rollup",
+                        format_func=lambda name: name.replace("_", " × ").title())
+    metric = col2.radio("Metric", list(TIMESERIES_METRICS), horizontal=True, key="arrivals_metric",
+                        format_func=TIMESERIES_METRICS.get)
+    fig_trend = get_figure("arrivals_trend", store.trend(rollup, metric, start, end))
+    st.plotly_chart(fig_trend, use_container_width=True)
+    st.caption(f"{store.manifest['rows']:,} monthly district records, {years[0]}-{years[-1]} "
+               f"(sources: {', '.join(store.manifest.get('sources', [])) or 'unspecified'})")
+
+@traced()
+def create_state_tab(state_data, state_table):
+    """Creates a standardized tab for a single state. `state_table` holds the state's rows of the report table."""
+    if RENDER_MODE == "batched":
+        create_state_sections(state_data, state_table)
+        return
+
     st.header(f"{state_data['Tagline']}")
     st.markdown("---")
 
     # --- Metrics ---
     st.subheader("Key Quantitative Indicators")
-    cols = st.columns(len(state_data['Metrics']))
-    for i, metric in enumerate(state_data['Metrics']):
-        cols[i].metric(label=metric['label'], value=metric['value'], delta=metric['delta'])
+    values = state_table.select(section="Metrics", kind="value")
+    deltas = state_table.select(section="Metrics", kind="delta")
+    cols = st.columns(len(values))
+    for i in range(len(values)):
+        cols[i].metric(label=str(values.label[i]), value=values.display(i), delta=deltas.display(i))
     
     st.markdown("**Hospitality & Policy Metrics:**")
-    for item in state_data['Other_Metrics']:
-        st.markdown(f"- {item}")
+    other_metrics = state_table.select(section="Other_Metrics")
+    for i in range(len(other_metrics)):
+        st.markdown(f"- **{other_metrics.label[i]}:** {other_metrics.display(i)}")
         
     st.markdown("---")
     
@@ -438,24 +1185,354 @@ def create_state_tab(state_data):
         st.markdown(f"**Airports:** {state_data['Infrastructure']['Airports']}")
         st.markdown(f"**Road Network:** {state_data['Infrastructure']['Highways']}")
 
+def create_state_sections(state_data, state_table):
+    """create_state_tab in RENDER_MODE="batched": one element per section."""
+    values = state_table.select(section="Metrics", kind="value")
+    deltas = state_table.select(section="Metrics", kind="delta")
+    other_metrics = state_table.select(section="Other_Metrics")
+
+    st.markdown(f"## {state_data['Tagline']}\n\n---\n\n### Key Quantitative Indicators")
+    st.markdown(card_grid_html(
+        metric_card_html(str(values.label[i]), values.display(i), deltas.display(i)) for i in range(len(values))),
+        unsafe_allow_html=True)
+    bullets = "\n".join(f"- **{other_metrics.label[i]}:** {other_metrics.display(i)}" for i in range(len(other_metrics)))
+    st.markdown(f"**Hospitality & Policy Metrics:**\n\n{bullets}\n\n---")
+
+    col1, col2 = st.columns(2)
+    archetype = state_data['Archetype']
+    col1.markdown(f"""### Emotional & Behavioural Patterns
+
+**Primary Archetype: {archetype['Name']}**
+
+**Motivations:** {archetype['Motivations']}
+
+**Key Sentiment Keywords:** {archetype['Keywords']}""")
+    destinations = "\n\n".join(f"**{dest}:** {tone}" for dest, tone in state_data['Micro_Destinations'].items())
+    col2.markdown(f"""### Emotional Tones by Micro-Destination
+
+{destinations}
+
+---
+
+### Accessibility & Infrastructure
+
+**Airports:** {state_data['Infrastructure']['Airports']}
+
+**Road Network:** {state_data['Infrastructure']['Highways']}""")
+
+# ----------------------------------------------------------------------
+# Report Retrieval (BM25 over DATA sections)
+# ----------------------------------------------------------------------
+
+STATE_SECTIONS = ["Metrics", "Other_Metrics", "Archetype", "Micro_Destinations", "Infrastructure"]
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for", "from", "had", "has",
+    "have", "how", "in", "is", "it", "me", "of", "on", "or", "the", "than", "that", "this", "to",
+    "was", "what", "which", "who", "with",
+}
+
+def tokenize(text):
+    """Lowercases and splits text into word tokens, dropping stop words."""
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOP_WORDS]
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) used for prompt budgeting."""
+    return len(text) // 4 + 1
+
+class ReportChunk:
+    """One retrievable section of the report, e.g. Kerala / Metrics."""
+
+    def __init__(self, chunk_id, text):
+        self.id = chunk_id
+        self.text = text
+        self.tokens = estimate_tokens(text)
+
+def chunk_report(data):
+    """Splits DATA into one chunk per Overview table and per (state, section)."""
+    chunks = []
+    for section, value in data['Overview'].items():
+        chunks.append(ReportChunk(f"Overview/{section}", f"### Overview: {section.replace('_', ' ')}\n{json.dumps(value, ensure_ascii=False)}"))
+    for state in (name for name in data if name != "Overview"):
+        for section in STATE_SECTIONS:
+            heading = f"### {state} ({data[state]['Tagline']}): {section.replace('_', ' ')}"
+            chunks.append(ReportChunk(f"{state}/{section}", f"{heading}\n{json.dumps(data[state][section], ensure_ascii=False)}"))
+    return chunks
+
+class ReportIndex:
+    """Okapi BM25 index over the report chunks."""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(chunk.text)) for chunk in chunks]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = sum(self.lengths) / max(len(self.lengths), 1)
+        doc_freq = Counter(term for tf in self.term_freqs for term in tf)
+        n = len(chunks)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    def score(self, query_terms, i):
+        tf, length = self.term_freqs[i], self.lengths[i]
+        total = 0.0
+        for term in query_terms:
+            if term in tf:
+                f = tf[term]
+                total += self.idf[term] * f * (self.k1 + 1) / (f + self.k1 * (1 - self.b + self.b * length / self.avg_length))
+        return total
+
+    def search(self, query, top_k, token_budget):
+        """Returns up to top_k matching chunks, best first, whose combined size fits token_budget."""
+        query_terms = set(tokenize(query))
+        scored = sorted(((self.score(query_terms, i), i) for i in range(len(self.chunks))), reverse=True)
+        results, used = [], 0
+        for score, i in scored:
+            if score <= 0 or len(results) >= top_k:
+                break
+            chunk = self.chunks[i]
+            if used + chunk.tokens > token_budget:
+                continue
+            results.append(chunk)
+            used += chunk.tokens
+        return results
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_report_index(version, _data):
+    """Builds the retrieval index once per data version, shared by every session."""
+    return ReportIndex(chunk_report(_data))
+
+# ----------------------------------------------------------------------
+# Structured Query Fast Path (answers numeric questions without the LLM)
+# ----------------------------------------------------------------------
+
+# Answer ranking / comparison / lookup questions over the structured tables
+# locally; everything else goes to the model
+LOCAL_ANSWERS = str(get_setting("LOCAL_ANSWERS", "true")).lower() == "true"
+
+QUERY_METRIC_PATTERNS = {
+    "domestic": r"\bdomestic\b",
+    "foreign": r"\b(foreign|international|overseas|inbound)\b",
+    "occupancy": r"\boccupanc(y|ies)\b",
+    "adr": r"\b(adr|average daily rates?|daily rates?|room rates?)\b",
+}
+ARRIVALS_PATTERN = r"\b(arrivals?|tourists?|visitors?|footfall)\b"
+RANK_HIGH_PATTERN = r"\b(highest|most|largest|biggest|top|maximum|max|best|busiest|rank|ranking|ranked)\b"
+RANK_LOW_PATTERN = r"\b(lowest|least|fewest|smallest|minimum|min|worst)\b"
+COMPARE_PATTERN = r"\b(compare|comparison|versus|vs|between|difference)\b"
+YEAR_PATTERN = r"\b(?:19|20)\d{2}\b"
+# Questions asking for explanation or judgement need the model
+OPEN_ENDED_PATTERN = r"\b(why|should|recommend|suggest|explain|strategy|strategic|reason|reasons|impact|opportunity|opportunities|predict|forecast|outlook)\b|\bhow\b(?! (many|much))"
+
+CITY_ALIASES = {"kochi": "Kerala", "cochin": "Kerala", "chennai": "Tamil Nadu", "bengaluru": "Karnataka",
+                "bangalore": "Karnataka", "hyderabad": "Telangana"}
+
+QUERY_METRICS = {
+    "domestic": ("domestic arrivals", "Comparative_Arrivals", "Domestic Arrivals"),
+    "foreign": ("foreign arrivals", "Comparative_Arrivals", "Foreign Arrivals"),
+    "occupancy": ("hotel occupancy", "Hospitality_KPIs", "Occupancy"),
+    "adr": ("hotel ADR", "Hospitality_KPIs", "ADR"),
+}
+
+def build_query_tables(table):
+    """
+    Returns {metric: {"label", "rows": {state: row}}} from the typed report
+    table, where each row has a numeric `value` (range midpoint, or None),
+    `display`, `period` and `citation`.
+    """
+    tables = {}
+    for metric, (label, section, table_metric) in QUERY_METRICS.items():
+        selected = table.select(section=section, metric=table_metric)
+        mid = selected.base_mid
+        rows = {}
+        for i in range(len(selected)):
+            row = selected.row(i)
+            if section == "Hospitality_KPIs":
+                # "Kochi Occupancy" + "Aug 2024" -> "Kochi, Aug 2024"
+                city = row["label"][:-len(table_metric)].strip()
+                period = ", ".join(p for p in (city, row["period"]) if p) or "N/A"
+                citation = "[Comparative Hospitality KPIs]"
+            else:
+                period = row["period"]
+                citation = f"[cite: {row['source']}]"
+            rows[row["state"]] = {
+                "value": None if math.isnan(mid[i]) else float(mid[i]),
+                "display": row["display"],
+                "period": period,
+                "citation": citation,
+            }
+        tables[metric] = {"label": label, "rows": rows}
+    return tables
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_query_tables(version, _data):
+    """Builds the structured query tables once per data version."""
+    return build_query_tables(get_report_table(version, _data))
+
+def route_question(question, states):
+    """
+    Classifies a question as a local structured query. Returns a dict with
+    `intent` ("ranking", "comparison" or "lookup"), `metrics`, `states`,
+    `descending` and the `years` asked about, or None when the question
+    should go to the model.
+    """
+    text = question.lower()
+    if re.search(OPEN_ENDED_PATTERN, text):
+        return None
+
+    metrics = [metric for metric, pattern in QUERY_METRIC_PATTERNS.items() if re.search(pattern, text)]
+    if not metrics and re.search(ARRIVALS_PATTERN, text):
+        metrics = ["domestic", "foreign"]
+    if not metrics:
+        return None
+
+    mentioned = []
+    for state in states:
+        if re.search(rf"\b{re.escape(state.lower())}\b", text):
+            mentioned.append((text.index(state.lower()), state))
+    for city, state in CITY_ALIASES.items():
+        match = re.search(rf"\b{city}\b", text)
+        if match and state not in (s for _, s in mentioned):
+            mentioned.append((match.start(), state))
+    mentioned = [state for _, state in sorted(mentioned)]
+
+    descending = not re.search(RANK_LOW_PATTERN, text)
+    ranking = re.search(RANK_HIGH_PATTERN, text) or not descending
+    if len(mentioned) >= 2 or (re.search(COMPARE_PATTERN, text) and mentioned):
+        intent = "comparison"
+    elif ranking and not mentioned:
+        # A ranking needs one unambiguous metric
+        if len(metrics) != 1:
+            return None
+        intent = "ranking"
+    elif len(mentioned) == 1 and not ranking:
+        intent = "lookup"
+    else:
+        return None
+    return {"intent": intent, "metrics": metrics, "states": mentioned, "descending": descending,
+            "years": re.findall(YEAR_PATTERN, text)}
+
+def describe_row(row):
+    return f"**{row['display']}** ({row['period']}) {row['citation']}"
+
+def in_years(row, years):
+    """Whether a row's period mentions one of `years` (always true when no year was asked for)."""
+    return not years or any(year in row["period"] for year in years)
+
+def join_names(names):
+    names = [f"**{name}**" for name in names]
+    return names[0] if len(names) == 1 else ", ".join(names[:-1]) + " and " + names[-1]
+
+def render_structured_answer(route, tables):
+    """
+    Formats the answer for a routed question from the query tables. Returns
+    None when the report has no figure for a year the question asks about,
+    so the question goes to the model.
+    """
+    lines = []
+    years = route.get("years", [])
+    if route["intent"] == "ranking":
+        table = tables[route["metrics"][0]]
+        ranked = sorted(((row["value"], state) for state, row in table["rows"].items()
+                         if row["value"] is not None and in_years(row, years)), reverse=route["descending"])
+        if not ranked:
+            return None
+        top_value = ranked[0][0]
+        leaders = [state for value, state in ranked if value == top_value]
+        extreme = "highest" if route["descending"] else "lowest"
+        numeric = sum(row["value"] is not None for row in table["rows"].values())
+        scope = "According to the report"
+        if years:
+            scope = f"Among the states with a {' or '.join(years)} figure in the report"
+        elif numeric < len(table["rows"]):
+            scope = f"Among the {numeric} of {len(table['rows'])} states with a numeric figure in the report"
+        if len(leaders) == 1:
+            lines.append(f"{scope}, **{leaders[0]}** has the {extreme} {table['label']}: {describe_row(table['rows'][leaders[0]])}.")
+        else:
+            lines.append(f"{scope}, {join_names(leaders)} are tied for the {extreme} {table['label']} "
+                         f"(**{table['rows'][leaders[0]]['display']}**).")
+        lines.append("")
+        lines.append(f"Ranking by {table['label']}:")
+        position = 0
+        for i, (value, state) in enumerate(ranked):
+            # Tied states share a position
+            if i == 0 or value != ranked[i - 1][0]:
+                position = i + 1
+            lines.append(f"{position}. {state}: {describe_row(table['rows'][state])}")
+        unavailable = [state for state, row in table["rows"].items() if row["value"] is None]
+        if unavailable:
+            lines.append("")
+            lines.append("Not ranked (no numeric figure in the report): " + ", ".join(
+                f"{state} ({table['rows'][state]['display']})" for state in unavailable))
+        other_period = [state for state, row in table["rows"].items()
+                        if row["value"] is not None and not in_years(row, years)]
+        if other_period:
+            lines.append("")
+            lines.append("Not ranked (figure for another period): " + ", ".join(
+                f"{state} ({table['rows'][state]['period']})" for state in other_period))
+        periods = {table["rows"][state]["period"] for _, state in ranked}
+        if len(periods) > 1:
+            lines.append("")
+            lines.append("*Note: the figures refer to different periods, as shown.*")
+    else:
+        if not all(in_years(tables[metric]["rows"][state], years) for metric in route["metrics"] for state in route["states"]):
+            return None
+        for metric in route["metrics"]:
+            table = tables[metric]
+            if route["intent"] == "lookup":
+                state = route["states"][0]
+                lines.append(f"According to the report, {state}'s {table['label']}: {describe_row(table['rows'][state])}.")
+                continue
+            lines.append(f"**{table['label'][0].upper() + table['label'][1:]}:**")
+            for state in route["states"]:
+                lines.append(f"- {state}: {describe_row(table['rows'][state])}")
+            compared = [(table["rows"][state]["value"], state) for state in route["states"] if table["rows"][state]["value"] is not None]
+            if len(compared) >= 2:
+                top_value = max(compared)[0]
+                leaders = [state for value, state in compared if value == top_value]
+                if len(leaders) == len(compared):
+                    lines.append("- The figures are the same.")
+                else:
+                    lines.append(f"- Highest: **{' and '.join(leaders)}**")
+            lines.append("")
+    if lines[-1]:
+        lines.append("")
+    lines.append("*Answered directly from the report data.*")
+    return "\n".join(lines)
+
+def answer_structured_query(question):
+    """Returns a local answer for ranking, comparison and lookup questions, or None."""
+    if not LOCAL_ANSWERS:
+        return None
+    tables = get_query_tables(DATA_VERSION, DATA)
+    route = route_question(question, STATE_NAMES)
+    if route is None:
+        return None
+    return render_structured_answer(route, tables)
+
 # ----------------------------------------------------------------------
 # Chatbot Functionality (NEW)
 # ----------------------------------------------------------------------
 
-def get_system_prompt(enable_search):
-    """Returns the appropriate system prompt based on whether search is enabled."""
-    rag_prompt = f"""
+# How much of the report goes into each request: "retrieval" sends only the
+# sections relevant to the question, "full" sends the whole report
+REPORT_CONTEXT = get_setting("REPORT_CONTEXT", "retrieval")
+RETRIEVAL_TOP_K = int(get_setting("RETRIEVAL_TOP_K", 6))
+# Upper bound on the (estimated) tokens of report data per request
+RETRIEVAL_TOKEN_BUDGET = int(get_setting("RETRIEVAL_TOKEN_BUDGET", 2500))
+
+RAG_PROMPT_TEMPLATE = """
     You are a specialized travel analyst assistant. Your knowledge is strictly limited to the data within the 'South India Travel Intelligence Report'.
     Do not use any external information, personal opinions, or make assumptions.
     Your sole purpose is to answer questions based *only* on the data provided below.
     If a question cannot be answered using this data, you MUST respond with:
     "I do not have that information in the provided report."
 
-    Here is the complete data from the report:
-    {json.dumps(DATA, indent=2)}
+    {report_intro}
+    {report}
     """
-    
-    agent_prompt = f"""
+
+AGENT_PROMPT_TEMPLATE = """
     You are a specialized travel analyst research agent. Your goal is to provide comprehensive answers to questions about South India tourism.
     
     You have two sources of information:
@@ -469,96 +1546,1037 @@ def get_system_prompt(enable_search):
     4.  **When you use Google Search,** you MUST cite your sources. For each piece of information from a search, append the source title and URL.
     5.  If you cannot find the answer in the report or with Google Search, state that the information is not available.
     
-    Here is the complete data from the report:
-    {json.dumps(DATA, indent=2)}
+    {report_intro}
+    {report}
     """
-    
-    return agent_prompt if enable_search else rag_prompt
 
-def call_gemini_chatbot(user_prompt, chat_history, enable_search):
+FULL_REPORT_INTRO = "Here is the complete data from the report:"
+EXCERPT_REPORT_INTRO = "Here are the sections of the report relevant to the question:"
+
+def render_system_prompt(enable_search, report_intro, report):
+    template = AGENT_PROMPT_TEMPLATE if enable_search else RAG_PROMPT_TEMPLATE
+    return template.format(report_intro=report_intro, report=report)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _build_system_prompts(version, _data):
+    """Builds the RAG and agent prompts once per data version, shared by every session."""
+    report_json = json.dumps(_data, indent=2)
+    return {
+        False: render_system_prompt(False, FULL_REPORT_INTRO, report_json),
+        True: render_system_prompt(True, FULL_REPORT_INTRO, report_json),
+    }
+
+@traced()
+def get_system_prompt(enable_search, query=None):
     """
-    Calls the Gemini API with the user prompt, chat history, and the system prompt.
-    Conditionally enables Google Search.
+    Returns the appropriate system prompt based on whether search is enabled.
+    With a query and REPORT_CONTEXT="retrieval", only the report sections
+    relevant to the query are included. A query that matches no section
+    (e.g. "Summarize the report") gets the whole report rather than none.
     """
-    # --- MODIFICATION START ---
-    # Securely get the API key from Streamlit secrets
-    apiKey = st.secrets.get("GEMINI_API_KEY")
-    if not apiKey:
-        return "Gemini API key not found. Please add it to your Streamlit secrets (`.streamlit/secrets.toml`) to enable the chatbot."
-    # --- MODIFICATION END ---
-        
-    apiUrl = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={apiKey}"
-    
-    contents = []
-    for message in chat_history:
-        contents.append({"role": message["role"], "parts": [{"text": message["content"]}]})
-    contents.append({"role": "user", "parts": [{"text": user_prompt}]})
+    if query and REPORT_CONTEXT == "retrieval":
+        chunks = get_report_index(DATA_VERSION, DATA).search(query, RETRIEVAL_TOP_K, RETRIEVAL_TOKEN_BUDGET)
+        if chunks:
+            return render_system_prompt(enable_search, EXCERPT_REPORT_INTRO, "\n\n".join(chunk.text for chunk in chunks))
+    return _build_system_prompts(DATA_VERSION, DATA)[bool(enable_search)]
+
+GEMINI_API_BASE = get_setting("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_MODEL = get_setting("GEMINI_MODEL", "gemini-1.5-flash")
+# Stream answers token-by-token via streamGenerateContent (set to "false" to disable)
+CHAT_STREAMING = str(get_setting("CHAT_STREAMING", "true")).lower() == "true"
+# Register the report as a server-side cachedContents entry and refer to it by
+# name instead of resending it as systemInstruction on every turn
+CONTEXT_CACHING = str(get_setting("CONTEXT_CACHING", "false")).lower() == "true"
+CONTEXT_CACHE_TTL_SECONDS = int(get_setting("CONTEXT_CACHE_TTL_SECONDS", 3600))
+# How long to wait before trying to create a cache again after the API refused
+CONTEXT_CACHE_RETRY_SECONDS = 600
+
+# Maximum keep-alive connections kept open to the API host
+HTTP_POOL_SIZE = int(get_setting("HTTP_POOL_SIZE", 20))
+
+@st.cache_resource(show_spinner=False)
+def get_http_session(pool_size=HTTP_POOL_SIZE):
+    """
+    Returns the process-wide HTTP session for the Gemini API. Every Streamlit
+    session and every retry reuses its pooled keep-alive connections instead
+    of paying a new TCP+TLS handshake per request.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    # pool_block=False: bursts beyond pool_size open extra connections instead of waiting
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Shared limits for calls to the Gemini API across all sessions in the process.
+# CHAT_MAX_IN_FLIGHT caps concurrent chat requests (the rest wait in a FIFO
+# queue); the token bucket spaces out HTTP attempts, retries included, to
+# stay under the API quota.
+CHAT_MAX_IN_FLIGHT = int(get_setting("CHAT_MAX_IN_FLIGHT", 8))
+CHAT_RATE_LIMIT_RPM = float(get_setting("CHAT_RATE_LIMIT_RPM", 60))
+CHAT_RATE_BURST = int(get_setting("CHAT_RATE_BURST", 10))
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate_per_second, capacity):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, sleeping as needed. Returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+@st.cache_resource(show_spinner=False)
+def get_rate_limiter():
+    return TokenBucket(CHAT_RATE_LIMIT_RPM / 60, CHAT_RATE_BURST)
+
+class ChatWorkerPool:
+    """
+    Runs chat requests on a bounded thread pool shared by every session, and
+    tracks queue depth and queue wait times for display.
+    """
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="gemini-chat")
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._started = 0
+        self._finished = 0
+        self._wait_times = deque(maxlen=200)
+
+    def _submit(self, fn, *args):
+        """Queues fn(*args). Returns (future, ticket) where ticket is the submission number."""
+        submitted_at = time.monotonic()
+
+        def run():
+            with self._lock:
+                self._started += 1
+                self._wait_times.append(time.monotonic() - submitted_at)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._finished += 1
+
+        with self._lock:
+            self._submitted += 1
+            ticket = self._submitted
+        return self._executor.submit(run), ticket
+
+    def position(self, ticket):
+        """Number of requests ahead of `ticket` that have not started yet (0 once it runs)."""
+        with self._lock:
+            return max(ticket - self._started - 1, 0) if ticket > self._started else 0
+
+    def run(self, fn, *args, on_wait=None):
+        """Runs fn(*args) on the pool and returns its result. on_wait(position, waited) is called while queued."""
+        future, ticket = self._submit(fn, *args)
+        started = time.monotonic()
+        while True:
+            try:
+                return future.result(timeout=0.5)
+            except FuturesTimeoutError:
+                if on_wait and self.position(ticket) > 0:
+                    on_wait(self.position(ticket), time.monotonic() - started)
+
+    def stream(self, generator_fn, *args, on_wait=None):
+        """
+        Runs generator_fn(*args) on the pool and yields its chunks as they are
+        produced. Returns the generator's return value.
+        """
+        chunks = queue.Queue()
+
+        def pump():
+            generator = generator_fn(*args)
+            try:
+                while True:
+                    chunks.put(("chunk", next(generator)))
+            except StopIteration as stop:
+                chunks.put(("done", stop.value))
+            except BaseException as e:
+                chunks.put(("error", e))
+
+        _, ticket = self._submit(pump)
+        started = time.monotonic()
+        while True:
+            try:
+                kind, value = chunks.get(timeout=0.5)
+            except queue.Empty:
+                if on_wait and self.position(ticket) > 0:
+                    on_wait(self.position(ticket), time.monotonic() - started)
+                continue
+            if kind == "chunk":
+                yield value
+            elif kind == "done":
+                return value
+            else:
+                raise value
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._wait_times)
+            return {
+                "in_flight": self._started - self._finished,
+                "queued": self._submitted - self._started,
+                "max_in_flight": self.max_in_flight,
+                "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+                "p95_wait": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            }
+
+@st.cache_resource(show_spinner=False)
+def get_chat_pool():
+    return ChatWorkerPool(CHAT_MAX_IN_FLIGHT)
+
+class ContextCacheRegistry:
+    """
+    Process-wide map of (data version, enable_search) -> cachedContents name.
+    Failed creations are remembered for CONTEXT_CACHE_RETRY_SECONDS so that an
+    account or model without caching support falls back to inline prompts
+    without paying for a failed request on every turn. The API call runs
+    outside the lock; concurrent requests for the same key share it.
+    Callers pass the version and a `create` callable from their own rerun:
+    this instance outlives the rerun whose module globals (DATA, the
+    system prompt) it would otherwise read.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (name or None, valid_until)
+        self._creating = {}  # key -> Future for the creation in progress
+
+    def get(self, version, enable_search, create):
+        """Returns the cachedContents name for the key, calling create() -> name or None when there is none."""
+        key = (version, bool(enable_search))
+        with self._lock:
+            name, valid_until = self._entries.get(key, (None, 0))
+            if time.time() < valid_until:
+                return name
+            future = self._creating.get(key)
+            creator = future is None
+            if creator:
+                future = self._creating[key] = Future()
+        if not creator:
+            return future.result()
+        name = None
+        try:
+            name = create()
+        finally:
+            with self._lock:
+                if name:
+                    # Refresh a minute before the server-side entry expires
+                    self._entries[key] = (name, time.time() + CONTEXT_CACHE_TTL_SECONDS - 60)
+                else:
+                    self._entries[key] = (None, time.time() + CONTEXT_CACHE_RETRY_SECONDS)
+                del self._creating[key]
+            future.set_result(name)
+        return name
+
+    def invalidate(self, name):
+        with self._lock:
+            self._entries = {k: v for k, v in self._entries.items() if v[0] != name}
+
+@st.cache_resource(show_spinner=False)
+def get_context_cache_registry():
+    return ContextCacheRegistry()
+
+def create_cached_context(enable_search, api_key):
+    """Creates a cachedContents entry holding the system prompt. Returns its name, or None."""
+    import requests
+
+    body = {
+        "model": f"models/{GEMINI_MODEL}",
+        "displayName": f"south-india-report-{DATA_VERSION[:12]}",
+        "systemInstruction": {"parts": [{"text": get_system_prompt(enable_search)}]},
+        "ttl": f"{CONTEXT_CACHE_TTL_SECONDS}s",
+    }
+    if enable_search:
+        body["tools"] = [{"google_search": {}}]
+    try:
+        get_rate_limiter().acquire()
+        response = get_http_session().post(f"{GEMINI_API_BASE}/cachedContents?key={api_key}", headers={'Content-Type': 'application/json'}, data=json.dumps(body), timeout=30)
+    except requests.exceptions.RequestException:
+        return None
+    if response.status_code != 200:
+        # e.g. the model does not support caching or the report is below the minimum cacheable size
+        return None
+    return response.json().get("name")
+
+def get_cached_context(enable_search, api_key):
+    """Returns the cachedContents name to use for this request, or None to send the prompt inline."""
+    if not CONTEXT_CACHING:
+        return None
+    return get_context_cache_registry().get(DATA_VERSION, enable_search, lambda: create_cached_context(enable_search, api_key))
+
+# Chat history sent with each request: the most recent turns are kept
+# verbatim, older ones are folded into a short running summary
+HISTORY_MAX_TURNS = int(get_setting("HISTORY_MAX_TURNS", 6))
+HISTORY_TOKEN_BUDGET = int(get_setting("HISTORY_TOKEN_BUDGET", 2000))
+HISTORY_SUMMARY_TOKEN_BUDGET = int(get_setting("HISTORY_SUMMARY_TOKEN_BUDGET", 400))
+
+# Chat message roles as the Gemini API names them; it accepts only "user" and "model"
+GEMINI_ROLES = {"user": "user", "assistant": "model"}
+
+def first_sentence(text, limit):
+    """Returns the first sentence of `text` (without any sources footer), cut to `limit` characters."""
+    text = " ".join(text.split("**Sources:**")[0].split())
+    sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 1].rstrip() + "…"
+
+class ChatHistoryWindow:
+    """
+    Turns a session's message list into request `contents` of bounded size.
+    The last HISTORY_MAX_TURNS turns are sent verbatim as long as they fit
+    HISTORY_TOKEN_BUDGET. Older turns are folded, once each, into a running
+    summary of one line per turn, trimmed to HISTORY_SUMMARY_TOKEN_BUDGET.
+    Keep one instance per conversation so folding stays incremental.
+    """
+
+    def __init__(self, max_turns=None, token_budget=None, summary_token_budget=None):
+        self.max_turns = max_turns or HISTORY_MAX_TURNS
+        self.token_budget = token_budget or HISTORY_TOKEN_BUDGET
+        self.summary_token_budget = summary_token_budget or HISTORY_SUMMARY_TOKEN_BUDGET
+        self.summary_lines = []
+        self.folded = 0  # number of leading messages already in the summary
+
+    def window_start(self, messages, offset=0):
+        """Absolute index of the first message that is sent verbatim."""
+        start, used, turns = len(messages), 0, 0
+        for i in range(len(messages) - 1, -1, -1):
+            used += estimate_tokens(messages[i]["content"])
+            if used > self.token_budget:
+                break
+            if messages[i]["role"] == "user":
+                turns += 1
+                if turns > self.max_turns:
+                    break
+                start = i
+        return max(offset + start, self.folded)
+
+    def fold(self, messages, end, offset=0):
+        """Adds the messages from absolute index self.folded up to `end` to the running summary."""
+        question = None
+        for message in messages[max(self.folded - offset, 0):end - offset]:
+            if message["role"] == "user":
+                if question:
+                    self.summary_lines.append(f"- Asked: {question}")
+                question = first_sentence(message["content"], 150)
+            else:
+                answer = first_sentence(message["content"], 200)
+                self.summary_lines.append(f"- Asked: {question} Answer: {answer}" if question else f"- Answer: {answer}")
+                question = None
+        if question:
+            self.summary_lines.append(f"- Asked: {question}")
+        self.folded = end
+
+        # Keep the most recent lines that fit the summary budget
+        kept, used = [], 0
+        for line in reversed(self.summary_lines):
+            used += estimate_tokens(line)
+            if used > self.summary_token_budget:
+                break
+            kept.append(line)
+        self.summary_lines = kept[::-1]
+
+    def to_contents(self, messages):
+        """
+        Returns the `contents` entries for the conversation so far (excluding
+        the new prompt). `messages` may be a MessageTail holding only the
+        latest messages; its offset keeps the summary's position absolute.
+        """
+        offset = getattr(messages, "offset", 0)
+        start = self.window_start(messages, offset)
+        if start > self.folded:
+            self.fold(messages, start, offset)
+
+        contents = []
+        if self.summary_lines:
+            summary = "Summary of our earlier conversation:\n" + "\n".join(self.summary_lines)
+            contents.append({"role": "user", "parts": [{"text": summary}]})
+            contents.append({"role": "model", "parts": [{"text": "Noted."}]})
+        for message in messages[start - offset:]:
+            contents.append({"role": GEMINI_ROLES[message["role"]], "parts": [{"text": message["content"]}]})
+        return contents
+
+# Chat transcripts are kept out of st.session_state: each session holds only
+# its id, while the process-wide ChatHistoryStore keeps the latest
+# CHAT_TAIL_MESSAGES messages of active sessions in memory and everything
+# older in a SQLite file, paged back in when the user scrolls up. Keep the
+# tail above 2 * HISTORY_MAX_TURNS so the model's history window is always
+# in memory. A transcript can only be read by the session that owns its id,
+# so it is deleted once that session has ended; the file is private to this
+# process (0600, in a 0700 directory) and removed when the process exits.
+CHAT_HISTORY_DIR = get_setting("CHAT_HISTORY_DIR", os.path.join(os.path.expanduser("~"), ".cache", "hospitality_dashboard"))
+CHAT_TAIL_MESSAGES = int(get_setting("CHAT_TAIL_MESSAGES", 20))
+CHAT_HISTORY_PAGE_SIZE = int(get_setting("CHAT_HISTORY_PAGE_SIZE", 20))
+CHAT_SESSION_IDLE_SECONDS = float(get_setting("CHAT_SESSION_IDLE_SECONDS", 30 * 60))
+CHAT_HISTORY_SWEEP_SECONDS = 60
+
+CHAT_ROLES = ("user", "assistant")
+
+class MessageTail(list):
+    """The latest messages of a conversation; `offset` is the number of older messages before them."""
+
+    def __init__(self, messages=(), offset=0):
+        super().__init__(messages)
+        self.offset = offset
+
+def session_active(session_id):
+    """Whether `session_id` is a Streamlit session still connected to this server."""
+    return runtime.exists() and runtime.get_instance().is_active_session(session_id)
+
+def remove_database(path):
+    for suffix in ("", "-wal", "-shm"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path + suffix)
+
+def remove_stale_databases(directory):
+    """Deletes history files left behind by dashboard processes that are no longer running."""
+    for name in os.listdir(directory):
+        match = re.fullmatch(r"chat-(\d+)\.sqlite3", name)
+        if not match or int(match.group(1)) == os.getpid():
+            continue
+        try:
+            os.kill(int(match.group(1)), 0)
+        except ProcessLookupError:
+            remove_database(os.path.join(directory, name))
+        except PermissionError:
+            pass  # Another user's process is running
+
+class ChatHistoryStore:
+    """
+    Bounded, process-wide chat transcripts. Messages beyond each session's
+    in-memory tail are written to SQLite, zlib-compressed. A session idle
+    for idle_seconds leaves memory (its tail is written out first) while
+    its Streamlit session is still connected, and reloads from disk if it
+    comes back; once the Streamlit session has ended its messages are
+    deleted. Session ids should be Streamlit session ids; others are
+    deleted as soon as they go idle.
+    """
+
+    def __init__(self, path, tail_size, idle_seconds):
+        import sqlite3
+
+        self.path = path
+        self.tail_size = tail_size
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        # Nothing in an existing file (a previous process with the same pid) is readable any more
+        remove_database(path)
+        os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        # SQLite creates the -wal and -shm files with the database's permissions
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                session_id TEXT NOT NULL, seq INTEGER NOT NULL, role INTEGER NOT NULL, content BLOB NOT NULL,
+                PRIMARY KEY (session_id, seq)) WITHOUT ROWID;
+        """)
+        self._tails = {}  # session_id -> deque of (seq, role, content), the latest messages
+        self._written = {}  # session_id -> messages with seq below this are on disk
+        self._last_seen = {}  # every session with messages in memory or on disk
+        self._last_sweep = time.monotonic()
+
+    @staticmethod
+    def _decode(row):
+        seq, role, content = row
+        return seq, CHAT_ROLES[role], zlib.decompress(content).decode("utf-8")
+
+    def _write(self, session_id, messages):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO chat_messages VALUES (?, ?, ?, ?)",
+            [(session_id, seq, CHAT_ROLES.index(role), zlib.compress(content.encode("utf-8"))) for seq, role, content in messages])
+
+    def _session(self, session_id):
+        """The session's in-memory tail, loaded from disk if needed. Call with the lock held."""
+        self._last_seen[session_id] = time.time()
+        tail = self._tails.get(session_id)
+        if tail is None:
+            rows = self._db.execute(
+                "SELECT seq, role, content FROM chat_messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, self.tail_size)).fetchall()
+            tail = self._tails[session_id] = deque((self._decode(row) for row in reversed(rows)), maxlen=self.tail_size)
+            self._written[session_id] = tail[-1][0] + 1 if tail else 0
+        return tail
+
+    def append(self, session_id, role, content):
+        with self._lock:
+            tail = self._session(session_id)
+            seq = tail[-1][0] + 1 if tail else self._written[session_id]
+            if len(tail) == self.tail_size and tail[0][0] >= self._written[session_id]:
+                # The oldest message is about to leave memory
+                self._write(session_id, [tail[0]])
+                self._written[session_id] = tail[0][0] + 1
+            tail.append((seq, role, content))
+        self.sweep()
+
+    def tail(self, session_id):
+        """Returns the session's in-memory messages as a MessageTail."""
+        with self._lock:
+            tail = self._session(session_id)
+            offset = tail[0][0] if tail else 0
+            return MessageTail(({"role": role, "content": content} for _, role, content in tail), offset)
+
+    def older(self, session_id, before, limit):
+        """Returns up to `limit` messages preceding message number `before`, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, role, content FROM chat_messages WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (session_id, before, limit)).fetchall()
+        return [{"role": role, "content": content} for _, role, content in map(self._decode, reversed(rows))]
+
+    def sweep(self, force=False):
+        """Moves idle sessions out of memory and deletes ended ones, at most once a minute."""
+        now = time.monotonic()
+        if not force and now - self._last_sweep < CHAT_HISTORY_SWEEP_SECONDS:
+            return
+        with self._lock:
+            self._last_sweep = now
+            wall_now = time.time()
+            for session_id, last_seen in list(self._last_seen.items()):
+                if wall_now - last_seen < self.idle_seconds:
+                    continue
+                if session_active(session_id):
+                    if session_id in self._tails:
+                        written = self._written.pop(session_id)
+                        self._write(session_id, [m for m in self._tails.pop(session_id) if m[0] >= written])
+                    continue
+                self._db.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+                self._tails.pop(session_id, None)
+                self._written.pop(session_id, None)
+                del self._last_seen[session_id]
 
-    system_prompt = get_system_prompt(enable_search)
+    def close(self):
+        with self._lock:
+            self._db.close()
+            remove_database(self.path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions_in_memory": len(self._tails),
+                "messages_in_memory": sum(len(tail) for tail in self._tails.values()),
+                "messages_on_disk": self._db.execute("SELECT COUNT(*) FROM chat_messages").fetchone()[0],
+            }
+
+@st.cache_resource(show_spinner=False)
+def get_chat_history_store():
+    import atexit
+
+    os.makedirs(CHAT_HISTORY_DIR, mode=0o700, exist_ok=True)
+    os.chmod(CHAT_HISTORY_DIR, 0o700)
+    remove_stale_databases(CHAT_HISTORY_DIR)
+    store = ChatHistoryStore(os.path.join(CHAT_HISTORY_DIR, f"chat-{os.getpid()}.sqlite3"), CHAT_TAIL_MESSAGES,
+                             CHAT_SESSION_IDLE_SECONDS)
+    atexit.register(store.close)
+    return store
+
+def build_chat_payload(user_prompt, chat_history, enable_search, cached_context=None, history_window=None):
+    """
+    Builds the generateContent request body shared by the blocking and streaming calls.
+    `chat_history` holds the earlier messages only, not `user_prompt` itself.
+    """
+    history_window = history_window or ChatHistoryWindow()
+    contents = history_window.to_contents(chat_history)
+    contents.append({"role": "user", "parts": [{"text": user_prompt}]})
 
     payload = {
         "contents": contents,
-        "systemInstruction": {"parts": [{"text": system_prompt}]},
         "generationConfig": {"temperature": 0.2, "topP": 0.8, "topK": 10}
     }
+
+    if cached_context:
+        # System instruction and tools live in the cached context
+        payload["cachedContent"] = cached_context
+        return payload
+
+    # Retrieve on the current question plus the previous one, so follow-ups
+    # ("and for Goa?") still pull in the sections the conversation is about
+    previous_questions = [m["content"] for m in chat_history if m["role"] == "user"][-1:]
+    query = " ".join(previous_questions + [user_prompt])
+    payload["systemInstruction"] = {"parts": [{"text": get_system_prompt(enable_search, query)}]}
     
     if enable_search:
         payload["tools"] = [{"google_search": {}}]
 
-    max_retries = 5
-    delay = 1
+    return payload
+
+def drop_cached_context(cached_context):
+    """Forgets a cached context the API rejected (e.g. expired); later requests recreate it."""
+    get_context_cache_registry().invalidate(cached_context)
+
+def grounding_sources(grounding_metadata):
+    """Returns the distinct web sources ({"title", "uri"}) of a candidate's grounding metadata, in order."""
+    attributions = grounding_metadata.get('groundingAttributions', []) + grounding_metadata.get('groundingChunks', [])
+    sources = [
+        {"title": attr['web'].get('title', attr['web']['uri']), "uri": attr['web']['uri']}
+        for attr in attributions if attr.get('web')
+    ]
+    # Remove duplicate sources
+    return [dict(t) for t in dict.fromkeys(tuple(d.items()) for d in sources)]
+
+def format_sources(grounding_metadata):
+    """Returns the markdown "Sources" footer for a candidate's grounding metadata."""
+    unique_sources = grounding_sources(grounding_metadata)
+    if not unique_sources:
+        return ""
+    footer = "\n\n**Sources:**\n"
+    for i, source in enumerate(unique_sources):
+        footer += f"{i+1}. [{source['title']}]({source['uri']})\n"
+    return footer
+
+# Cross-session cache of complete answers. Report-only answers depend only on
+# the (static) report and can live long; search-grounded answers go stale fast.
+ANSWER_CACHE_SIZE = int(get_setting("ANSWER_CACHE_SIZE", 512))
+ANSWER_CACHE_TTL_SECONDS = int(get_setting("ANSWER_CACHE_TTL_SECONDS", 24 * 3600))
+ANSWER_CACHE_SEARCH_TTL_SECONDS = int(get_setting("ANSWER_CACHE_SEARCH_TTL_SECONDS", 600))
+
+def normalize_prompt(prompt):
+    """Lowercases, collapses whitespace and strips surrounding punctuation."""
+    return " ".join(prompt.lower().split()).strip(" ?!.")
+
+class AnswerCache:
+    """Thread-safe LRU cache of chatbot answers with per-entry expiry and hit/miss counters."""
+
+    def __init__(self, max_entries, ttl, search_ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.search_ttl = search_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (answer, expires_at)
+
+    def make_key(self, user_prompt, chat_history, enable_search, data_version, model):
+        """
+        Key on the normalized prompt, search flag, model, data version and the
+        previous turn, which is what a follow-up question usually refers to.
+        The caller passes the version and model: this instance outlives the
+        rerun whose module globals it would otherwise read.
+        """
+        previous_turn = [(m["role"], m["content"]) for m in chat_history[-2:]]
+        raw = json.dumps([normalize_prompt(user_prompt), bool(enable_search), model, data_version, previous_turn])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, answer, enable_search):
+        if self.max_entries <= 0:
+            return
+        ttl = self.search_ttl if enable_search else self.ttl
+        with self._lock:
+            self._entries[key] = (answer, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+@st.cache_resource(show_spinner=False)
+def get_answer_cache():
+    return AnswerCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_SEARCH_TTL_SECONDS)
+
+# Retry policy for Gemini calls. Only transient statuses are retried; the
+# whole retry sequence, attempts included, must fit in CHAT_RETRY_DEADLINE_SECONDS.
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# Upper bound on a single attempt's connect and read timeouts
+CHAT_REQUEST_TIMEOUT_SECONDS = 120
+CHAT_MAX_ATTEMPTS = int(get_setting("CHAT_MAX_ATTEMPTS", 5))
+# Leaves a first attempt its full timeout (a slow search-grounded answer can
+# take well over a minute), plus room for retries after fast failures
+CHAT_RETRY_DEADLINE_SECONDS = float(get_setting("CHAT_RETRY_DEADLINE_SECONDS", CHAT_REQUEST_TIMEOUT_SECONDS + 30))
+CHAT_BACKOFF_BASE_SECONDS = 1.0
+CHAT_BACKOFF_MAX_SECONDS = 8.0
+# Consecutive failed attempts (across all sessions) that open the breaker,
+# and how long it stays open before letting a single probe request through
+CIRCUIT_FAILURE_THRESHOLD = int(get_setting("CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_RESET_SECONDS = float(get_setting("CIRCUIT_RESET_SECONDS", 30))
+
+class GeminiRequestError(Exception):
+    """A Gemini call failed; str(error) is the message shown to the user."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+class CircuitBreaker:
+    """
+    Process-wide circuit breaker for the Gemini API. After `failure_threshold`
+    consecutive failures it opens and requests fail immediately; after
+    `reset_seconds` one probe request is let through, and its outcome closes
+    or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._probe_owner = None  # thread sending the half-open probe
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "open" if time.monotonic() - self._opened_at < self.reset_seconds else "half-open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            self._probe_owner = threading.get_ident()
+            return True
+
+    def release(self):
+        """Ends this thread's probe without an outcome (it was never sent), so a later request can probe."""
+        with self._lock:
+            if self._probe_in_flight and self._probe_owner == threading.get_ident():
+                self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+@st.cache_resource(show_spinner=False)
+def get_circuit_breaker():
+    return CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+
+def parse_retry_after(value):
+    """Returns the delay in seconds from a Retry-After header (seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def api_error_message(response):
+    """Extracts the error message from a Gemini error response body."""
+    try:
+        return response.json()["error"]["message"]
+    except (ValueError, KeyError, TypeError):
+        return response.reason or ""
+
+def record_attempt(status, started):
+    """Records the duration (until response headers) of one Gemini HTTP attempt."""
+    if TRACING:
+        get_metrics_registry().observe("gemini_attempt_seconds", time.perf_counter() - started, status=status)
+
+def post_gemini(api_url, payload, stream=False):
+    """
+    POSTs a request to the Gemini API with status-aware retries and returns
+    the 200 response (the caller closes it). Client errors (4xx other than
+    408/429) fail immediately; 429/503 honor Retry-After; other transient
+    failures back off with full jitter. Raises GeminiRequestError.
+    """
+    import requests
+
+    breaker = get_circuit_breaker()
+    deadline = time.monotonic() + CHAT_RETRY_DEADLINE_SECONDS
+    body = json.dumps(payload)
+    error = GeminiRequestError("The analyst service is currently unavailable. Please try again later.")
+    if TRACING:
+        get_metrics_registry().observe("gemini_request_bytes", len(body.encode("utf-8")), BYTES_BUCKETS)
+
+    attempts = 0
+    try:
+        for attempt in range(CHAT_MAX_ATTEMPTS):
+            if not breaker.allow():
+                raise GeminiRequestError("The analyst service is having trouble right now, so requests are paused briefly. Please try again in a minute.")
+            retry_after = None
+            try:
+                get_rate_limiter().acquire()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                started = time.perf_counter()
+                attempts += 1
+                try:
+                    response = get_http_session().post(api_url, headers={'Content-Type': 'application/json'}, data=body,
+                                                       timeout=min(CHAT_REQUEST_TIMEOUT_SECONDS, remaining), stream=stream)
+                except requests.exceptions.RequestException as e:
+                    record_attempt("error", started)
+                    breaker.record_failure()
+                    error = GeminiRequestError(f"An error occurred while contacting the analyst service: {e}")
+                else:
+                    record_attempt(str(response.status_code), started)
+                    if response.status_code == 200:
+                        breaker.record_success()
+                        return response
+                    status = response.status_code
+                    message = api_error_message(response)
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    response.close()
+                    if status not in RETRYABLE_STATUS:
+                        # The service is up; retrying the same request will not help
+                        breaker.record_success()
+                        raise GeminiRequestError(f"The analyst service rejected the request (HTTP {status}: {message}).", status)
+                    breaker.record_failure()
+                    error = GeminiRequestError(f"The analyst service is currently unavailable (HTTP {status}). Please try again later.", status)
+            finally:
+                # A half-open probe that never reached the API (deadline spent in the rate
+                # limiter, unexpected error) must not leave the breaker waiting on it forever
+                breaker.release()
+
+            if attempt == CHAT_MAX_ATTEMPTS - 1:
+                break
+            if retry_after is None:
+                retry_after = random.uniform(0, min(CHAT_BACKOFF_MAX_SECONDS, CHAT_BACKOFF_BASE_SECONDS * 2 ** attempt))
+            if time.monotonic() + retry_after > deadline:
+                break
+            time.sleep(retry_after)
+
+        raise error
+    finally:
+        if TRACING and attempts:
+            get_metrics_registry().observe("gemini_retries", attempts - 1, RETRIES_BUCKETS)
+
+def post_chat_request(api_url, user_prompt, chat_history, enable_search, history_window, stream=False):
+    """
+    Sends a chat request, using the cached report context when enabled. If the
+    API rejects the cached context (e.g. it expired), it is dropped and the
+    request is resent once with the prompt inline.
+    """
+    cached_context = get_cached_context(enable_search, get_setting("GEMINI_API_KEY"))
+    payload = build_chat_payload(user_prompt, chat_history, enable_search, cached_context, history_window)
+    try:
+        return post_gemini(api_url, payload, stream)
+    except GeminiRequestError as e:
+        if not cached_context or e.status not in (400, 403, 404):
+            raise
+    drop_cached_context(cached_context)
+    payload = build_chat_payload(user_prompt, chat_history, enable_search, history_window=history_window)
+    return post_gemini(api_url, payload, stream)
+
+def request_gemini_answer(user_prompt, chat_history, enable_search, history_window=None):
+    """
+    Calls the Gemini API with the user prompt, chat history, and the system prompt.
+    Returns a dict with `text` and `ok` (on failure `text` is the message to
+    show instead), plus the response's `usage` metadata and grounding
+    `sources` when there are any.
+    """
+    answer = {"text": "", "ok": False, "usage": None, "sources": []}
+    apiKey = get_setting("GEMINI_API_KEY")
+    if not apiKey:
+        answer["text"] = "Gemini API key not found. Please add it to your Streamlit secrets (`.streamlit/secrets.toml`) to enable the chatbot."
+        return answer
+        
+    apiUrl = f"{GEMINI_API_BASE}/models/{GEMINI_MODEL}:generateContent?key={apiKey}"
+    try:
+        response = post_chat_request(apiUrl, user_prompt, chat_history, enable_search, history_window)
+    except GeminiRequestError as e:
+        answer["text"] = str(e)
+        return answer
+
+    result = response.json()
+    answer["usage"] = result.get('usageMetadata')
+    record_usage(answer["usage"])
+    
+    # Check for empty or blocked responses
+    if 'candidates' not in result or not result['candidates']:
+        answer["text"] = "I'm sorry, I couldn't generate a response. The request may have been blocked due to safety settings."
+        return answer
     
-    for attempt in range(max_retries):
+    candidate = result['candidates'][0]
+    text = candidate.get('content', {}).get('parts', [{}])[0].get('text', '')
+
+    if not text:
+        answer["text"] = "I'm sorry, I received an empty response from the analyst service."
+        return answer
+
+    # Handle grounding metadata for search results
+    if enable_search and 'groundingMetadata' in candidate:
+        answer["sources"] = grounding_sources(candidate['groundingMetadata'])
+        text += format_sources(candidate['groundingMetadata'])
+    
+    answer["text"], answer["ok"] = text, True
+    return answer
+
+def iter_sse_events(response):
+    """Yields the decoded JSON payload of each `data:` line in a server-sent events response."""
+    # SSE is always UTF-8 (the API sends no charset, and requests would otherwise
+    # decode text/event-stream as ISO-8859-1, garbling "₹" and accented names)
+    response.encoding = "utf-8"
+    # chunk_size=None hands lines over as soon as they arrive instead of buffering
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        yield json.loads(data)
+
+@traced()
+def call_gemini_chatbot(user_prompt, chat_history, enable_search, history_window=None, on_wait=None):
+    """
+    Answers the user prompt from the answer cache or via the Gemini API.
+    Conditionally enables Google Search. Pass the conversation's
+    ChatHistoryWindow as `history_window` to keep its summary incremental.
+    API calls run on the shared chat worker pool; on_wait(position, waited)
+    is called while the request is queued behind others.
+    """
+    local_answer = answer_structured_query(user_prompt)
+    if local_answer is not None:
+        return local_answer
+
+    cache = get_answer_cache()
+    key = cache.make_key(user_prompt, chat_history, enable_search, DATA_VERSION, GEMINI_MODEL)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    answer = get_chat_pool().run(request_gemini_answer, user_prompt, chat_history, enable_search, history_window, on_wait=on_wait)
+    if answer["ok"]:
+        cache.put(key, answer["text"], enable_search)
+    return answer["text"]
+
+@traced()
+def stream_gemini_chatbot(user_prompt, chat_history, enable_search, history_window=None, on_wait=None):
+    """
+    Streaming variant of call_gemini_chatbot. Yields the answer in chunks as
+    they arrive, or all at once when it is answered locally or from the
+    answer cache.
+    """
+    local_answer = answer_structured_query(user_prompt)
+    if local_answer is not None:
+        yield local_answer
+        return
+
+    cache = get_answer_cache()
+    key = cache.make_key(user_prompt, chat_history, enable_search, DATA_VERSION, GEMINI_MODEL)
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    stream = get_chat_pool().stream(_stream_gemini_answer, user_prompt, chat_history, enable_search, history_window, on_wait=on_wait)
+    while True:
         try:
-            response = requests.post(apiUrl, headers={'Content-Type': 'application/json'}, data=json.dumps(payload), timeout=120)
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Check for empty or blocked responses
-                if 'candidates' not in result or not result['candidates']:
-                     return "I'm sorry, I couldn't generate a response. The request may have been blocked due to safety settings."
-                
-                candidate = result['candidates'][0]
-                text = candidate.get('content', {}).get('parts', [{}])[0].get('text', '')
-
-                if not text:
-                    return "I'm sorry, I received an empty response from the analyst service."
-
-                # Handle grounding metadata for search results
-                if enable_search and 'groundingMetadata' in candidate:
-                    attributions = candidate['groundingMetadata'].get('groundingAttributions', [])
-                    sources = [
-                        {"title": attr['web']['title'], "uri": attr['web']['uri']}
-                        for attr in attributions if attr.get('web')
-                    ]
-                    
-                    # Remove duplicate sources
-                    unique_sources = [dict(t) for t in {tuple(d.items()) for d in sources}]
-                    
-                    if unique_sources:
-                        text += "\n\n**Sources:**\n"
-                        for i, source in enumerate(unique_sources):
-                            text += f"{i+1}. [{source['title']}]({source['uri']})\n"
-                
-                return text
-            
-        except requests.exceptions.RequestException as e:
-            if attempt == max_retries - 1:
-                return f"An error occurred while contacting the analyst service: {e}"
-        
-        time.sleep(delay)
-        delay *= 2
+            chunk = next(stream)
+        except StopIteration as stop:
+            if stop.value:
+                cache.put(key, "".join(chunks), enable_search)
+            return
+        chunks.append(chunk)
+        yield chunk
+
+def _stream_gemini_answer(user_prompt, chat_history, enable_search, history_window=None):
+    """
+    Streaming variant of request_gemini_answer. Yields answer text chunks from
+    the streamGenerateContent SSE endpoint as they arrive, followed by the
+    sources footer once the stream ends. Errors are yielded as a message.
+    The generator's return value is True when a complete answer was streamed.
+    """
+    import requests
+
+    apiKey = get_setting("GEMINI_API_KEY")
+    if not apiKey:
+        yield "Gemini API key not found. Please add it to your Streamlit secrets (`.streamlit/secrets.toml`) to enable the chatbot."
+        return False
+
+    apiUrl = f"{GEMINI_API_BASE}/models/{GEMINI_MODEL}:streamGenerateContent?alt=sse&key={apiKey}"
+    try:
+        response = post_chat_request(apiUrl, user_prompt, chat_history, enable_search, history_window, stream=True)
+    except GeminiRequestError as e:
+        yield str(e)
+        return False
+
+    # Once text has been shown the request cannot be retried, so a broken
+    # stream ends the answer with a note instead
+    with response:
+        received_text = False
+        grounding_metadata = None
+        usage_metadata = None
+        try:
+            for event in iter_sse_events(response):
+                # Each chunk carries the running token counts; the last one has the totals
+                usage_metadata = event.get('usageMetadata', usage_metadata)
+                for candidate in event.get('candidates', [])[:1]:
+                    for part in candidate.get('content', {}).get('parts', []):
+                        if part.get('text'):
+                            received_text = True
+                            yield part['text']
+                    # The grounding metadata arrives with the final chunk(s)
+                    if 'groundingMetadata' in candidate:
+                        grounding_metadata = candidate['groundingMetadata']
+        except (requests.exceptions.RequestException, ValueError) as e:
+            yield f"\n\n*The connection to the analyst service was interrupted: {e}*"
+            return False
+        record_usage(usage_metadata)
+
+    if not received_text:
+        yield "I'm sorry, I couldn't generate a response. The request may have been blocked due to safety settings."
+        return False
+
+    if enable_search and grounding_metadata:
+        footer = format_sources(grounding_metadata)
+        if footer:
+            yield footer
+    return True
 
-    return "The analyst service is currently unavailable. Please try again later."
 
+def show_older_messages():
+    st.session_state.chat_older_pages += 1
 
+@traced()
 def create_chatbot_tab():
     """Populates the new Chatbot tab."""
     st.header("Research Agent Chatbot")
     
     # Check if API key is configured before showing the main info
-    if not st.secrets.get("GEMINI_API_KEY"):
+    if not get_setting("GEMINI_API_KEY"):
         st.error("The Research Agent is not configured. Please add your Gemini API key to the application's secrets.")
         st.code("""
 # 1. Create a file: .streamlit/secrets.toml
@@ -568,58 +2586,122 @@ GEMINI_API_KEY = "YOUR_API_KEY_HERE"
         return # Stop rendering the rest of the tab
 
     st.info("Ask me questions about the 'South India Travel Intelligence Report'. My knowledge is limited *only* to the data in this dashboard.")
-    
+    chat_panel()
+
+# A fragment: the toggle, "Show earlier messages" and each chat turn rerun
+# only this function, not the overview and state views rendered alongside it.
+@st.fragment
+@traced()
+def chat_panel():
+    """The chatbot's controls, transcript and input."""
     enable_search = st.toggle("Enable Live Internet Search (for data *outside* the report)", value=False)
+    cache_stats = get_answer_cache().stats()
+    pool_stats = get_chat_pool().stats()
+    st.caption(
+        f"Answer cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} entries · "
+        f"Analyst service: {pool_stats['in_flight']}/{pool_stats['max_in_flight']} busy, {pool_stats['queued']} queued, "
+        f"avg wait {pool_stats['avg_wait']:.1f}s (p95 {pool_stats['p95_wait']:.1f}s)"
+    )
+    if get_circuit_breaker().state == "open":
+        st.warning("The analyst service is currently failing; new questions are paused briefly while it recovers.")
     st.markdown("---")
     
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    if "chat_session_id" not in st.session_state:
+        # The Streamlit session id, so the transcript is deleted when the session ends
+        ctx = get_script_run_ctx()
+        st.session_state.chat_session_id = ctx.session_id if ctx else uuid.uuid4().hex
+        st.session_state.chat_older_pages = 0
+    if "history_window" not in st.session_state:
+        st.session_state.history_window = ChatHistoryWindow()
+    history = get_chat_history_store()
+    session_id = st.session_state.chat_session_id
+    messages = history.tail(session_id)
 
-    for message in st.session_state.messages:
+    # Older messages stay on disk until asked for
+    pages = st.session_state.chat_older_pages
+    older = history.older(session_id, messages.offset, pages * CHAT_HISTORY_PAGE_SIZE) if pages else []
+    if messages.offset > len(older):
+        st.button(f"Show earlier messages ({messages.offset - len(older)} more)", on_click=show_older_messages)
+    for message in older + messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
     if prompt := st.chat_input("Which state had the most domestic arrivals?"):
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        # History sent to the model excludes the prompt itself, which is sent separately
+        chat_history = messages
+        history.append(session_id, "user", prompt)
         with st.chat_message("user"):
             st.markdown(prompt)
 
         with st.chat_message("assistant"):
-            with st.spinner("Analyst is thinking..."):
-                response = call_gemini_chatbot(prompt, st.session_state.messages, enable_search)
-                st.markdown(response, unsafe_allow_html=True)
+            history_window = st.session_state.history_window
+            queue_status = st.empty()
+
+            def on_wait(position, waited):
+                queue_status.caption(f"Waiting for a free analyst slot: {position} request(s) ahead, {waited:.0f}s so far")
+
+            if CHAT_STREAMING:
+                response = st.write_stream(stream_gemini_chatbot(prompt, chat_history, enable_search, history_window, on_wait))
+            else:
+                with st.spinner("Analyst is thinking..."):
+                    response = call_gemini_chatbot(prompt, chat_history, enable_search, history_window, on_wait)
+                    st.markdown(response, unsafe_allow_html=True)
+            queue_status.empty()
         
-        st.session_state.messages.append({"role": "assistant", "content": response})
+        history.append(session_id, "assistant", response)
 
 # ----------------------------------------------------------------------
-# Main App (Tabs)
+# Main App (Navigation)
 # ----------------------------------------------------------------------
 
-tab_names = [
-    "South India Overview", 
-    "Kerala", 
-    "Tamil Nadu", 
-    "Karnataka", 
-    "Goa", 
-    "Andhra Pradesh", 
-    "Telangana",
-    "Chatbot"
-]
-tabs = st.tabs(tab_names)
-
-with tabs[0]:
-    create_overview_tab(DATA)
-with tabs[1]:
-    create_state_tab(DATA['Kerala'])
-with tabs[2]:
-    create_state_tab(DATA['Tamil Nadu'])
-with tabs[3]:
-    create_state_tab(DATA['Karnataka'])
-with tabs[4]:
-    create_state_tab(DATA['Goa'])
-with tabs[5]:
-    create_state_tab(DATA['Andhra Pradesh'])
-with tabs[6]:
-    create_state_tab(DATA['Telangana'])
-with tabs[7]:
-    create_chatbot_tab()
\ No newline at end of file
+# "pages" renders only the selected view (one st.Page per view, shown as a
+# top navigation bar with its own URL). "tabs" is the original st.tabs
+# layout, which executes every view on each rerun.
+NAVIGATION_MODE = get_setting("NAVIGATION_MODE", "pages")
+
+def state_url_path(state):
+    """URL path (and static export file name) of a state's view, e.g. "tamil-nadu"."""
+    return state.lower().replace(" ", "-")
+
+def get_views():
+    """Returns (title, url_path, render function) for every dashboard view."""
+    views = [("South India Overview", "overview", lambda: create_overview_tab(DATA))]
+    for state in STATE_NAMES:
+        views.append((state, state_url_path(state),
+                      lambda state=state: create_state_tab(DATA[state], get_report_table(DATA_VERSION, DATA).select(state=state))))
+    views.append(("Chatbot", "chatbot", create_chatbot_tab))
+    return views
+
+def render_tabs(views):
+    """Renders every view inside st.tabs (legacy layout)."""
+    tabs = st.tabs([title for title, _, _ in views])
+    for tab, (_, _, render) in zip(tabs, views):
+        with tab:
+            render()
+
+def render_pages(views):
+    """Renders only the selected view, using top navigation with one URL per view."""
+    pages = [
+        st.Page(render, title=title, url_path=url_path, default=(i == 0))
+        for i, (title, url_path, render) in enumerate(views)
+    ]
+    st.navigation(pages, position="top").run()
+
+def main():
+    st.set_page_config(
+        page_title="South India Tourism Intelligence Dashboard",
+        layout="wide",
+        initial_sidebar_state="collapsed"
+    )
+    if METRICS_PORT or METRICS_FILE:
+        start_metrics_exporters()
+    views = get_views()
+    with trace_rerun():
+        if NAVIGATION_MODE == "tabs":
+            render_tabs(views)
+        else:
+            render_pages(views)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+# load_test.py
+"""
+Multi-session load test for the dashboard.
+
+Starts the app with `streamlit run` (pointed at an in-process
+mock_gemini_server) and opens --sessions simulated browser sessions on its
+websocket. Each session speaks the same protocol as the browser and, until
+--duration runs out, repeats a random action after an exponentially
+distributed think time:
+
+  view    open a random dashboard page (a full script run)
+  toggle  flip "Enable Live Internet Search" on the chatbot page
+  chat    submit a unique question on the chatbot page (goes to the mock)
+
+Toggle flips and chat turns run in the chat fragment, as in the browser.
+Reports p50/p95/p99 rerun latency (send to script_finished), throughput,
+error rate per action, and the server's RSS after a warm-up visit of
+every page and at its peak during the run.
+A chat turn whose answer did not come from the mock (e.g. an injected
+failure the app reported to the user) counts as an error.
+
+  python load_test.py --sessions 20 --duration 60
+  python load_test.py --sessions 50 --mock-delay 1.5 --mock-error-rate 0.05 --output load.json
+  python load_test.py --url http://localhost:8501 --pid 12345   # an app that is already running
+
+Server settings can be passed with --env, e.g. --env CHAT_MAX_IN_FLIGHT=16
+--env NAVIGATION_MODE=tabs. With NAVIGATION_MODE=tabs there are no pages
+and a view is a plain rerun.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+import mock_gemini_server
+
+ACTIONS = ("view", "toggle", "chat")
+FINISHED_OK = (ForwardMsg.DESCRIPTOR.fields_by_name["script_finished"].enum_type
+               .values_by_name["FINISHED_SUCCESSFULLY"].number,
+               ForwardMsg.DESCRIPTOR.fields_by_name["script_finished"].enum_type
+               .values_by_name["FINISHED_FRAGMENT_RUN_SUCCESSFULLY"].number)
+CHATBOT_URL_PATH = "chatbot"
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def latency_summary(samples_ms):
+    """p50/p95/p99 (milliseconds) of a list of latencies."""
+    if not samples_ms:
+        return {"n": 0}
+    return {
+        "n": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 0.50), 1),
+        "p95_ms": round(percentile(samples_ms, 0.95), 1),
+        "p99_ms": round(percentile(samples_ms, 0.99), 1),
+        "max_ms": round(max(samples_ms), 1),
+    }
+
+
+def rss_bytes(pid):
+    """Resident set size of a process (Linux /proc), or None when unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class RunResult:
+    """What one script run sent back: status, elapsed time and the widgets it rendered."""
+
+    def __init__(self):
+        self.status = None
+        self.elapsed_ms = 0.0
+        self.bytes = 0
+        self.exception = None
+        self.widgets = {}  # element type -> (widget id, fragment id)
+        self.pages = {}  # url path -> page script hash
+        self.text = []
+
+
+class Session:
+    """One simulated browser tab connected to the app's websocket."""
+
+    def __init__(self, index, url, timeout):
+        self.index = index
+        self.url = url.rstrip("/").replace("http", "ws", 1) + "/_stcore/stream"
+        self.timeout = timeout
+        self.ws = None
+        self.pages = {}
+        self.page = ""
+        self.widgets = {}
+        self.search_enabled = False
+        self.questions = 0
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def rerun(self, page="", widgets=(), fragment_id=""):
+        """Requests a script run like the browser does and waits for it to finish."""
+        back_msg = BackMsg()
+        client_state = back_msg.rerun_script
+        client_state.page_script_hash = page
+        if fragment_id:
+            client_state.fragment_id = fragment_id
+        client_state.widget_states.widgets.extend(widgets)
+        result = RunResult()
+        start = time.perf_counter()
+        await self.ws.send(back_msg.SerializeToString())
+        async with asyncio.timeout(self.timeout):
+            while result.status is None:
+                data = await self.ws.recv()
+                result.bytes += len(data)
+                self.read(ForwardMsg.FromString(data), result)
+        result.elapsed_ms = (time.perf_counter() - start) * 1000
+        if result.pages:
+            self.pages = result.pages
+        if result.widgets:
+            self.widgets = result.widgets
+        self.page = page
+        return result
+
+    @staticmethod
+    def read(msg, result):
+        kind = msg.WhichOneof("type")
+        if kind == "script_finished":
+            result.status = msg.script_finished
+        elif kind == "navigation":
+            result.pages = {page.url_pathname: page.page_script_hash for page in msg.navigation.app_pages}
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            element = msg.delta.new_element
+            element_type = element.WhichOneof("type")
+            if element_type == "exception":
+                result.exception = element.exception.message
+            elif element_type in ("checkbox", "chat_input"):
+                result.widgets[element_type] = (getattr(element, element_type).id, msg.delta.fragment_id)
+            elif element_type == "markdown":
+                result.text.append(element.markdown.body)
+
+    def widget_states(self, chat=None):
+        """The chatbot page's widget values: the toggle, plus a chat submission if given."""
+        states = []
+        if "checkbox" in self.widgets:
+            states.append(WidgetState(id=self.widgets["checkbox"][0], bool_value=self.search_enabled))
+        if chat is not None and "chat_input" in self.widgets:
+            state = WidgetState(id=self.widgets["chat_input"][0])
+            state.chat_input_value.data = chat
+            states.append(state)
+        return states
+
+    async def open_chatbot(self):
+        """Navigates to the chatbot page unless already there; returns the run result, if any."""
+        chat_page = self.pages.get(CHATBOT_URL_PATH)
+        if "chat_input" in self.widgets and (chat_page is None or self.page == chat_page):
+            return None
+        self.search_enabled = False
+        return await self.rerun(chat_page or "")
+
+    async def act(self, action, run_id):
+        """Performs one action. Returns [(action, RunResult, ok)] for every run it caused."""
+        runs = []
+        if action == "view":
+            page = random.choice([h for path, h in self.pages.items() if path != CHATBOT_URL_PATH] or [""])
+            result = await self.rerun(page)
+            return [("view", result, result.status in FINISHED_OK and not result.exception)]
+        navigation = await self.open_chatbot()
+        if navigation is not None:
+            runs.append(("view", navigation, navigation.status in FINISHED_OK and not navigation.exception))
+        fragment_id = self.widgets.get("chat_input", ("", ""))[1]
+        if action == "toggle":
+            self.search_enabled = not self.search_enabled
+            result = await self.rerun(self.page, self.widget_states(), fragment_id)
+            ok = result.status in FINISHED_OK and not result.exception
+        else:
+            self.questions += 1
+            # Unique open-ended questions skip the report fast path and the answer cache
+            question = f"Why does load test question {run_id}-{self.index}-{self.questions} matter for Kerala tourism?"
+            result = await self.rerun(self.page, self.widget_states(chat=question), fragment_id)
+            ok = (result.status in FINISHED_OK and not result.exception
+                  and any(text.startswith("Mock analyst answer") for text in result.text))
+        runs.append((action, result, ok))
+        return runs
+
+
+async def run_session(index, args, weights, deadline, samples, run_id):
+    """Drives one session until the deadline; appends (action, elapsed_ms, bytes, ok, error) to samples."""
+    session = Session(index, args.url, args.timeout)
+    await asyncio.sleep(random.uniform(0, args.ramp_up))
+    try:
+        await session.connect()
+        result = await session.rerun()
+        samples.append(("view", result.elapsed_ms, result.bytes, result.status in FINISHED_OK and not result.exception,
+                        result.exception))
+        while time.monotonic() < deadline:
+            await asyncio.sleep(random.expovariate(1 / args.think_time) if args.think_time > 0 else 0)
+            action = random.choices(ACTIONS, weights)[0]
+            for name, result, ok in await session.act(action, run_id):
+                samples.append((name, result.elapsed_ms, result.bytes, ok, result.exception))
+    except (OSError, TimeoutError, websockets.WebSocketException) as e:
+        samples.append(("session", 0.0, 0, False, f"{type(e).__name__}: {e}"))
+    finally:
+        await session.close()
+
+
+async def sample_rss(pid, peak, stop):
+    while not stop.is_set():
+        rss = rss_bytes(pid)
+        if rss:
+            peak[0] = max(peak[0], rss)
+        try:
+            await asyncio.wait_for(stop.wait(), 0.5)
+        except TimeoutError:
+            pass
+
+
+async def warm_up(args):
+    """Visits every page once so imports and caches are loaded before the RSS baseline is taken."""
+    session = Session(-1, args.url, args.timeout)
+    await session.connect()
+    try:
+        await session.rerun()
+        for page in session.pages.values():
+            await session.rerun(page)
+    finally:
+        await session.close()
+
+
+async def load(args, weights, pid):
+    await warm_up(args)
+    rss_before = rss_bytes(pid) if pid else None
+    samples = []
+    stop = asyncio.Event()
+    peak = [rss_before or 0]
+    sampler = asyncio.create_task(sample_rss(pid, peak, stop)) if pid else None
+    run_id = time.time_ns()
+    start = time.monotonic()
+    deadline = start + args.ramp_up + args.duration
+    await asyncio.gather(*(run_session(i, args, weights, deadline, samples, run_id) for i in range(args.sessions)))
+    elapsed = time.monotonic() - start
+    stop.set()
+    if sampler:
+        await sampler
+    return samples, elapsed, rss_before, peak[0]
+
+
+def report(samples, elapsed, sessions, rss_before, rss_peak):
+    results = {"sessions": sessions, "elapsed_s": round(elapsed, 1)}
+    runs = [sample for sample in samples if sample[0] != "session"]
+    for action in ACTIONS + ("all",):
+        selected = [sample for sample in runs if action in (sample[0], "all")]
+        errors = [sample for sample in selected if not sample[3]]
+        results[action] = {
+            "latency": latency_summary([sample[1] for sample in selected if sample[3]]),
+            "throughput_per_s": round(len(selected) / elapsed, 2) if elapsed else 0,
+            "errors": len(errors),
+            "error_rate": round(len(errors) / len(selected), 4) if selected else 0,
+            "mean_bytes": round(sum(sample[2] for sample in selected) / len(selected)) if selected else 0,
+        }
+    failures = [sample[4] for sample in samples if sample[0] == "session"]
+    exceptions = sorted({sample[4] for sample in runs if sample[4]})
+    results["session_failures"] = len(failures)
+    results["errors_seen"] = (failures + exceptions)[:10]
+    if rss_before:
+        results["rss"] = {
+            "warm_mib": round(rss_before / 2**20, 1),
+            "peak_mib": round(rss_peak / 2**20, 1),
+            "per_session_mib": round((rss_peak - rss_before) / 2**20 / sessions, 2),
+        }
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_healthy(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"streamlit exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+def start_app(args, api_base, history_dir):
+    """Launches the dashboard with `streamlit run`; returns (process, url)."""
+    port = free_port()
+    env = dict(os.environ, GEMINI_API_BASE=api_base, GEMINI_API_KEY="mock", CHAT_RATE_LIMIT_RPM="0",
+               CHAT_HISTORY_DIR=history_dir)
+    env.update(setting.split("=", 1) for setting in args.env)
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hospitality_dashboard.py")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true", "--server.port", str(port),
+         "--server.address", "127.0.0.1", "--browser.gatherUsageStats", "false"],
+        env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def parse_mix(text):
+    weights = dict.fromkeys(ACTIONS, 0.0)
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in weights:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r} (expected {', '.join(ACTIONS)})")
+        weights[name] = float(weight)
+    return [weights[action] for action in ACTIONS]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent simulated sessions (default: 10).")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load after ramp-up (default: 30).")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Seconds over which sessions connect (default: 5).")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds between actions (default: 2).")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("view=5,toggle=1,chat=3"),
+                        help="Action weights (default: view=5,toggle=1,chat=3).")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for one script run.")
+    parser.add_argument("--url", help="Load an already running app instead of starting one (chat uses its own backend).")
+    parser.add_argument("--pid", type=int, help="Process to sample RSS from with --url.")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Setting for the started app, e.g. CHAT_MAX_IN_FLIGHT=16 (repeatable).")
+    parser.add_argument("--mock-delay", type=float, default=0.5, help="Mock Gemini response delay in seconds.")
+    parser.add_argument("--mock-chunk-delay", type=float, default=0.02, help="Mock delay between streamed chunks.")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0, help="Probability of an injected mock failure.")
+    parser.add_argument("--mock-error-status", type=int, default=503, help="HTTP status of injected failures.")
+    parser.add_argument("--output", help="Also write the JSON results here.")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's log output.")
+    args = parser.parse_args(argv)
+
+    server = process = None
+    try:
+        with tempfile.TemporaryDirectory() as history_dir:
+            if args.url:
+                pid = args.pid
+            else:
+                server, api_base = mock_gemini_server.start_in_background(
+                    delay=args.mock_delay, chunk_delay=args.mock_chunk_delay,
+                    error_rate=args.mock_error_rate, error_status=args.mock_error_status)
+                process, args.url = start_app(args, api_base, history_dir)
+                pid = process.pid
+            wait_until_healthy(args.url, process)
+            samples, elapsed, rss_before, rss_peak = asyncio.run(load(args, args.mix, pid))
+            results = report(samples, elapsed, args.sessions, rss_before, rss_peak)
+            if server is not None:
+                with server.RequestHandlerClass.lock:
+                    results["mock_server"] = dict(server.RequestHandlerClass.stats)
+    except RuntimeError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if server is not None:
+            server.shutdown()
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 0 if results["all"]["errors"] == 0 and not results["session_failures"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+# mock_gemini_server.py
+"""
+Local stand-in for the Gemini REST API, for exercising the dashboard's chatbot
+without network access or quota.
+
+Serves:
+  POST /v1beta/models/<model>:generateContent
+  POST /v1beta/models/<model>:streamGenerateContent?alt=sse
+  POST /v1beta/cachedContents          (disable with --no-caching)
+
+Faults can be injected to exercise retries and the circuit breaker:
+  --fail-first N      the first N requests fail with --error-status
+  --error-rate P      each later request fails with probability P
+  --error-status S    status for injected failures (default 503)
+  --retry-after SECS  send a Retry-After header with injected failures
+
+Run it and point the dashboard at it:
+  python mock_gemini_server.py --port 8765 --delay 0.5 --chunk-delay 0.05
+  GEMINI_API_BASE=http://127.0.0.1:8765/v1beta GEMINI_API_KEY=mock streamlit run hospitality_dashboard.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+def last_user_text(body):
+    """Returns the text of the last user turn in a generateContent request body."""
+    for content in reversed(body.get("contents", [])):
+        if content.get("role") == "user":
+            return " ".join(part.get("text", "") for part in content.get("parts", []))
+    return ""
+
+
+def make_answer(body):
+    """Builds a deterministic mock answer for a request body."""
+    return f"Mock analyst answer to: {last_user_text(body)}"
+
+
+def make_candidate(text, body, final):
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}}
+    if final:
+        candidate["finishReason"] = "STOP"
+        if body.get("tools"):
+            candidate["groundingMetadata"] = {
+                "groundingChunks": [{"web": {"title": "Mock Source", "uri": "https://example.com/mock-source"}}]
+            }
+    return candidate
+
+
+def make_usage(body, answer_text):
+    """Approximate usageMetadata: about four characters per token, like the dashboard's estimate."""
+    prompt_tokens = len(json.dumps(body)) // 4
+    candidate_tokens = len(answer_text) // 4 + 1
+    return {"promptTokenCount": prompt_tokens, "candidatesTokenCount": candidate_tokens,
+            "totalTokenCount": prompt_tokens + candidate_tokens}
+
+
+def error_body(code, status, message):
+    return {"error": {"code": code, "message": message, "status": status}}
+
+
+class MockGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None  # argparse.Namespace, set by make_server()
+    cached_contents = None  # name -> cachedContents body, set by make_server()
+    stats = None  # request counters, set by make_server()
+    lock = None  # guards stats, set by make_server()
+
+    def setup(self):
+        super().setup()
+        # One handler instance per TCP connection; counts keep-alive reuse
+        with self.lock:
+            self.stats["connections"] += 1
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up, e.g. its timeout expired before a --delay
+
+    def log_message(self, format, *args):
+        if not self.config.quiet:
+            super().log_message(format, *args)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, status, obj):
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self.read_body()
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["request_bytes"] += int(self.headers.get("Content-Length", 0))
+            request_number = self.stats["requests"]
+        time.sleep(self.config.delay)
+
+        # Like the real API, reject roles other than user/model
+        roles = {content.get("role") for content in body.get("contents", [])}
+        if roles - {"user", "model"}:
+            self.send_json(400, error_body(400, "INVALID_ARGUMENT", "Please use a valid role: user, model."))
+            return
+
+        if request_number <= self.config.fail_first or random.random() < self.config.error_rate:
+            self.send_injected_error()
+            return
+
+        if path.endswith("/cachedContents"):
+            self.create_cached_content(body)
+            return
+        if body.get("cachedContent"):
+            if body["cachedContent"] not in self.cached_contents:
+                self.send_json(404, error_body(404, "NOT_FOUND", f"CachedContent not found: {body['cachedContent']}"))
+                return
+            # Tools registered with the cached context apply to this request
+            body.setdefault("tools", self.cached_contents[body["cachedContent"]].get("tools"))
+
+        if path.endswith(":generateContent"):
+            answer = make_answer(body)
+            self.send_json(200, {"candidates": [make_candidate(answer, body, final=True)], "usageMetadata": make_usage(body, answer)})
+        elif path.endswith(":streamGenerateContent"):
+            self.stream_answer(body)
+        else:
+            self.send_json(404, {"error": {"code": 404, "message": f"Unknown path {path}", "status": "NOT_FOUND"}})
+
+    def send_injected_error(self):
+        with self.lock:
+            self.stats["injected_errors"] += 1
+        status = self.config.error_status
+        data = json.dumps(error_body(status, "UNAVAILABLE" if status >= 500 else "INJECTED", "Injected fault")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if self.config.retry_after is not None:
+            self.send_header("Retry-After", str(self.config.retry_after))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def create_cached_content(self, body):
+        if not self.config.caching:
+            self.send_json(400, error_body(400, "INVALID_ARGUMENT", "Cached content is not supported for this model."))
+            return
+        name = f"cachedContents/mock-{len(self.cached_contents) + 1}"
+        self.cached_contents[name] = body
+        self.send_json(200, {"name": name, "model": body.get("model"), "ttl": body.get("ttl")})
+
+    def stream_answer(self, body):
+        self.send_response(200)
+        # Raw UTF-8 and no charset parameter, like the real API
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = make_answer(body).split(" ")
+        streamed = ""
+        for i, word in enumerate(words):
+            final = i == len(words) - 1
+            text = word + ("" if final else " ")
+            streamed += text
+            chunk = {"candidates": [make_candidate(text, body, final)], "usageMetadata": make_usage(body, streamed)}
+            self.write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\r\n\r\n".encode("utf-8"))
+            time.sleep(self.config.chunk_delay)
+        self.write_chunk(b"")
+
+    def write_chunk(self, data):
+        """Writes one HTTP/1.1 chunked-encoding frame (an empty one ends the body)."""
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def make_server(config):
+    handler = type("ConfiguredMockGeminiHandler", (MockGeminiHandler,), {
+        "config": config,
+        "cached_contents": {},
+        "stats": {"connections": 0, "requests": 0, "request_bytes": 0, "injected_errors": 0},
+        "lock": threading.Lock(),
+    })
+    return ThreadingHTTPServer((config.host, config.port), handler)
+
+
+def start_in_background(**overrides):
+    """Starts a mock server on a free port in a daemon thread. Returns (server, api_base)."""
+    config = parse_args([])
+    config.port = 0
+    config.quiet = True
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    server = make_server(config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/v1beta"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local mock of the Gemini generateContent API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before responding.")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks.")
+    parser.add_argument("--fail-first", type=int, default=0, help="Fail the first N requests.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of failing any later request.")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of injected failures.")
+    parser.add_argument("--retry-after", help="Retry-After header value sent with injected failures.")
+    parser.add_argument("--no-caching", dest="caching", action="store_false",
+                        help="Reject cachedContents creation, like a model without context caching.")
+    parser.add_argument("--quiet", action="store_true", help="Do not log requests.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    config = parse_args()
+    server = make_server(config)
+    print(f"Mock Gemini API listening on http://{config.host}:{server.server_address[1]}/v1beta")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass